@@ -0,0 +1,87 @@
+# run from the repository root: python benchmarks/ann_recall_benchmark.py
+import argparse
+import time
+
+import init
+import numpy as np
+
+from worker.operations.ml_models.IVFIndex import IVFIndex
+
+
+def make_factors(
+    n_items: int, n_queries: int, n_factors: int, n_topics: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Items and users drawn around shared "topics", as trained factors are.
+    rng = np.random.default_rng(0)
+    topics = rng.normal(0, 0.2, (n_topics, n_factors))
+    item_factors = topics[rng.integers(0, n_topics, n_items)]
+    item_factors += rng.normal(0, 0.2, (n_items, n_factors))
+    item_bias = rng.normal(0, 0.3, n_items)
+    user_factors = topics[rng.integers(0, n_topics, n_queries)]
+    user_factors += rng.normal(0, 0.2, (n_queries, n_factors))
+
+    return (
+        item_factors.astype(np.float32),
+        item_bias.astype(np.float32),
+        user_factors.astype(np.float32),
+    )
+
+
+def exact_top_k(item_vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ item_vectors.T
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--factors", type=int, default=100)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--lists", type=int, default=0)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    item_factors, item_bias, user_factors = make_factors(
+        args.items, args.queries, args.factors, args.topics
+    )
+    queries = np.hstack([user_factors, np.ones((args.queries, 1), np.float32)])
+    item_vectors = np.hstack([item_factors, item_bias[:, None]])
+
+    start = time.perf_counter()
+    index = IVFIndex.build(
+        item_factors, item_bias, n_lists=args.lists or None, random_state=0
+    )
+    print(f"built {index.n_lists} lists in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    for query in queries:
+        exact_top_k(item_vectors, query[None], args.k)
+    exact_ms = (time.perf_counter() - start) / args.queries * 1000
+    exact = exact_top_k(item_vectors, queries, args.k)
+
+    print(
+        f"{'n_probe':>8} {'recall@' + str(args.k):>10} {'scanned':>8} "
+        f"{'ms/query':>9} {'speedup':>8}"
+    )
+    for n_probe in args.probes:
+        start = time.perf_counter()
+        results = [index.search(query[None], args.k, n_probe)[0] for query in queries]
+        ann_ms = (time.perf_counter() - start) / args.queries * 1000
+
+        hits = sum(
+            len(np.intersect1d(items, expected))
+            for (items, _), expected in zip(results, exact)
+        )
+        scanned = np.mean(
+            [len(items) for items, _ in index.candidates(queries[:50], n_probe)]
+        )
+        print(
+            f"{n_probe:>8} {hits / exact.size:>10.3f} {scanned / args.items:>8.1%} "
+            f"{ann_ms:>9.2f} {exact_ms / ann_ms:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# run from the repository root: python benchmarks/model_artifact_benchmark.py
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import init
+import numpy as np
+from pandas import DataFrame
+from surprise import SVD, Dataset, Reader
+
+from worker.operations.ml_models.FactorModel import FactorModel
+
+
+def train_svd(n_users: int, n_items: int, n_ratings: int, n_factors: int) -> SVD:
+    # One epoch is enough: only the artifact size and load time matter here.
+    rng = np.random.default_rng(0)
+    ratings = DataFrame(
+        {
+            "user_id": rng.integers(0, n_users, n_ratings),
+            "isbn": rng.integers(0, n_items, n_ratings).astype(str),
+            "rating": rng.integers(1, 11, n_ratings),
+        }
+    ).drop_duplicates(["user_id", "isbn"])
+    trainset = Dataset.load_from_df(
+        ratings, Reader(rating_scale=(1, 10))
+    ).build_full_trainset()
+
+    return SVD(n_factors=n_factors, n_epochs=1, random_state=0).fit(trainset)
+
+
+def directory_size(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, file_name))
+        for file_name in os.listdir(directory)
+    )
+
+
+def timed(func) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--ratings", type=int, default=1_000_000)
+    parser.add_argument("--factors", type=int, default=100)
+    args = parser.parse_args()
+
+    algo = train_svd(args.users, args.items, args.ratings, args.factors)
+    query_user = np.array([0])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pickle_path = os.path.join(tmp_dir, "model.pkl")
+        with open(pickle_path, "wb") as file:
+            pickle.dump(algo, file)
+
+        def load_pickle():
+            with open(pickle_path, "rb") as file:
+                return FactorModel.from_surprise(pickle.load(file))
+
+        array_dir = os.path.join(tmp_dir, "model")
+        FactorModel.from_surprise(algo).save(array_dir)
+
+        print(
+            f"{'artifact':>16} {'size, MB':>9} {'load, ms':>9} {'first top-k, ms':>16}"
+        )
+        for name, size, load in (
+            ("pickled AlgoBase", os.path.getsize(pickle_path), load_pickle),
+            (
+                "npy + manifest",
+                directory_size(array_dir),
+                lambda: FactorModel.load(array_dir),
+            ),
+        ):
+            load_time, model = timed(load)
+            score_time, _ = timed(lambda: model.score_all(query_user).argmax())
+            print(
+                f"{name:>16} {size / 2**20:>9.1f} {load_time * 1000:>9.1f} "
+                f"{score_time * 1000:>16.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
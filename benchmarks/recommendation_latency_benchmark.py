@@ -0,0 +1,140 @@
+# run from the repository root: python benchmarks/recommendation_latency_benchmark.py
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import init
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from serving.RecommendationCache import RecommendationCache
+from serving.RecommendationEngine import RecommendationEngine
+from serving.ServingModel import ServingModel
+from worker.operations.ml_models.FactorModel import FactorModel
+from worker.operations.ml_models.ItemKNNIndex import ItemKNNIndex
+
+TASK_TYPE_ID = 1
+
+
+class SyntheticModelSource:
+    # Stands in for the database and saved_models: one random factor model, or
+    # an item-KNN model fitted on the random ratings.
+
+    def __init__(
+        self, n_users: int, n_items: int, n_factors: int, model_kind: str, knn_k: int
+    ) -> None:
+        self.n_users, self.n_items, self.n_factors = n_users, n_items, n_factors
+        self.model_kind, self.knn_k = model_kind, knn_k
+        self.model_uuid = uuid.uuid4()
+
+    def latest_model_uuid(self, task_type_id: int) -> uuid.UUID:
+        return self.model_uuid
+
+    def load(self, model_uuid: uuid.UUID) -> ServingModel:
+        rng = np.random.default_rng(0)
+        # 20 rated books per user.
+        users = np.repeat(np.arange(self.n_users), 20)
+        items = rng.integers(0, self.n_items, len(users))
+        seen_items = csr_matrix(
+            (np.ones(len(users), dtype=np.float32), (users, items)),
+            shape=(self.n_users, self.n_items),
+        )
+        if self.model_kind == "itemknn":
+            # Duplicate (user, book) draws are summed by csr_matrix; use its
+            # entries so every rating is unique.
+            seen_items.data[:] = 1
+            rated = seen_items.tocoo()
+            model = ItemKNNIndex.fit(
+                rated.row,
+                rated.col,
+                rng.integers(1, 11, rated.nnz),
+                user_ids=np.arange(self.n_users),
+                isbns=np.arange(self.n_items).astype(str),
+                rating_scale=(0, 10),
+                k=self.knn_k,
+            )
+            return ServingModel(model_uuid, model, seen_items, threshold=None)
+
+        model = FactorModel(
+            global_mean=3.0,
+            user_bias=rng.normal(0, 0.3, self.n_users).astype(np.float32),
+            item_bias=rng.normal(0, 0.3, self.n_items).astype(np.float32),
+            user_factors=rng.normal(0, 0.1, (self.n_users, self.n_factors)).astype(
+                np.float32
+            ),
+            item_factors=rng.normal(0, 0.1, (self.n_items, self.n_factors)).astype(
+                np.float32
+            ),
+            user_ids=np.arange(self.n_users),
+            isbns=np.arange(self.n_items).astype(str),
+            rating_scale=(0, 10),
+        )
+
+        return ServingModel(model_uuid, model, seen_items, threshold=None)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--model", choices=["factor", "itemknn"], default="factor")
+    parser.add_argument("--factors", type=int, default=100)
+    parser.add_argument("--knn-k", type=int, default=40)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--p99-ms", type=float, default=50.0)
+    # 0 scores every request on its own.
+    parser.add_argument("--batch-window-ms", type=float, nargs="+", default=[0, 2])
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    model_source = SyntheticModelSource(
+        args.users, args.items, args.factors, args.model, args.knn_k
+    )
+    user_ids = np.random.default_rng(1).integers(0, args.users, args.requests)
+
+    print(
+        f"{'window, ms':>10} {'threads':>8} {'p50, ms':>8} {'p95, ms':>8} "
+        f"{'p99, ms':>8} {'req/s':>8} {'batch':>6} {'p99 target':>11}"
+    )
+    for batch_window_ms in args.batch_window_ms:
+        # The response cache is off: every request is scored.
+        engine = RecommendationEngine(
+            model_source,
+            cache=RecommendationCache(max_entries=0),
+            batch_window=batch_window_ms / 1000,
+            batch_max_size=args.batch_size,
+        )
+        engine.load(TASK_TYPE_ID)
+
+        def timed_request(user_id: int) -> float:
+            start = time.perf_counter()
+            engine.recommend(TASK_TYPE_ID, int(user_id), args.k)
+            return time.perf_counter() - start
+
+        def batch_counts() -> tuple[int, int]:
+            batching = engine.metrics()["batching"].get(TASK_TYPE_ID, {})
+            return batching.get("batches", 0), batching.get("requests", 0)
+
+        for concurrency in args.concurrency:
+            batches_before, requests_before = batch_counts()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                latencies = np.array(list(executor.map(timed_request, user_ids)))
+            elapsed = time.perf_counter() - start
+
+            batches, requests = batch_counts()
+            mean_batch = (requests - requests_before) / max(batches - batches_before, 1)
+            p50, p95, p99 = np.percentile(latencies * 1000, [50, 95, 99])
+            status = "ok" if p99 <= args.p99_ms else "missed"
+            print(
+                f"{batch_window_ms:>10} {concurrency:>8} {p50:>8.2f} {p95:>8.2f} "
+                f"{p99:>8.2f} {args.requests / elapsed:>8.0f} "
+                f"{max(mean_batch, 1):>6.1f} {status:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# run from the repository root: python benchmarks/train_test_split_benchmark.py
+import argparse
+import time
+
+import init
+import numpy as np
+from pandas import DataFrame, concat
+
+from helpers.group_sampling import sample_per_group
+
+TEST_SIZE = 0.2
+
+
+def legacy_train_test(data: DataFrame) -> tuple[DataFrame, DataFrame]:
+    # Former Preprocesor.__train_test, kept here as the baseline.
+    train_data = DataFrame(columns=data.columns)
+    test_data = DataFrame(columns=data.columns)
+
+    for _, user_data in data.groupby("user_id"):
+        rated_data = user_data[user_data["rating"] > 0]
+        test_count = int(len(rated_data) * TEST_SIZE)
+
+        test_indices = np.random.choice(
+            rated_data.index, size=test_count, replace=False
+        )
+        user_test_data = user_data.loc[test_indices]
+        user_train_data = user_data.drop(test_indices)
+
+        test_data = concat([test_data, user_test_data])
+        train_data = concat([train_data, user_train_data])
+
+    train_data = train_data.reset_index(drop=True)
+    test_data = test_data.reset_index(drop=True)
+
+    return train_data, test_data
+
+
+def vectorized_train_test(data: DataFrame) -> tuple[DataFrame, DataFrame]:
+    user_codes = data["user_id"].to_numpy()
+    rated = data["rating"].to_numpy() > 0
+    is_test = sample_per_group(user_codes, rated, TEST_SIZE, seed=42)
+
+    return data[~is_test].reset_index(drop=True), data[is_test].reset_index(drop=True)
+
+
+def make_ratings(n_users: int, n_items: int, ratings_per_user: int) -> DataFrame:
+    rng = np.random.default_rng(0)
+    n_rows = n_users * ratings_per_user
+    ratings = rng.integers(0, 11, size=n_rows)
+    ratings[rng.random(n_rows) < 0.6] = 0  # implicit ratings, as in Book-Crossing
+
+    return DataFrame(
+        {
+            "user_id": np.repeat(np.arange(n_users), ratings_per_user),
+            "isbn": rng.integers(0, n_items, size=n_rows).astype(str),
+            "rating": ratings,
+        }
+    )
+
+
+def timed(func, data: DataFrame) -> tuple[float, DataFrame]:
+    start = time.perf_counter()
+    _, test_data = func(data)
+    return time.perf_counter() - start, test_data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--ratings-per-user", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'users':>8} {'rows':>9} {'loop, s':>9} {'vectorized, s':>14} {'speedup':>8}"
+    )
+    for n_users in args.users:
+        data = make_ratings(n_users, n_users * 2, args.ratings_per_user)
+        loop_time, loop_test = timed(legacy_train_test, data)
+        fast_time, fast_test = timed(vectorized_train_test, data)
+
+        # Both splits must hold out the same number of ratings for every user.
+        loop_counts = loop_test.groupby("user_id").size()
+        fast_counts = fast_test.groupby("user_id").size()
+        assert loop_counts.sort_index().equals(fast_counts.sort_index())
+
+        print(
+            f"{n_users:>8} {len(data):>9} {loop_time:>9.3f} "
+            f"{fast_time:>14.4f} {loop_time / fast_time:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -20,9 +20,55 @@ LOCAL_CONNECTION_STRING = os.environ.get("LOCAL_CONNECTION_STRING")
 BOOKS_DF = os.environ.get("BOOKS_DF")
 RATINGS_DF = os.environ.get("RATINGS_DF")
 USERS_DF = os.environ.get("USERS_DF")
+DATASET_CACHE_DIR = os.environ.get("DATASET_CACHE_DIR")
+# Rows per chunk when streaming RATINGS_DF; 0 reads the whole file at once.
+RATINGS_CHUNK_SIZE = int(os.environ.get("RATINGS_CHUNK_SIZE", 0))
+# Reuse the previous training result when data and configuration are unchanged.
+TRAINING_CACHE_ENABLED = os.environ.get("TRAINING_CACHE_ENABLED", "1") == "1"
 
 TEST_SIZE = float(os.environ.get("TEST_SIZE"))
 VALIDATION_SIZE = float(os.environ.get("VALIDATION_SIZE"))
+SPLIT_SEED = int(os.environ.get("SPLIT_SEED", 42))
 
 RATING_SCALE_MIN = int(os.environ.get("RATING_SCALE_MIN"))
 RATING_SCALE_MAX = int(os.environ.get("RATING_SCALE_MAX"))
+
+# Warm-start retraining: epochs run from the previous model, and the drift
+# limits beyond which a full retrain is done instead.
+WARM_START_EPOCHS = int(os.environ.get("WARM_START_EPOCHS", 3))
+WARM_START_MAX_NEW_FRACTION = float(os.environ.get("WARM_START_MAX_NEW_FRACTION", 0.1))
+WARM_START_MAX_MEAN_SHIFT = float(os.environ.get("WARM_START_MAX_MEAN_SHIFT", 0.05))
+WARM_START_MAX_CYCLES = int(os.environ.get("WARM_START_MAX_CYCLES", 5))
+
+# Serving
+SERVING_TASK_TYPE_IDS = [
+    int(task_type_id)
+    for task_type_id in os.environ.get("SERVING_TASK_TYPE_IDS", "1").split(",")
+]
+SERVING_HOST = os.environ.get("SERVING_HOST", "0.0.0.0")
+SERVING_PORT = int(os.environ.get("SERVING_PORT", 8000))
+SERVING_DEFAULT_K = int(os.environ.get("SERVING_DEFAULT_K", 10))
+SERVING_MAX_K = int(os.environ.get("SERVING_MAX_K", 100))
+# Approximate top-K: an IVF index over the item factors is saved with factor
+# models of at least ANN_MIN_ITEMS books. ANN_N_LISTS = 0 picks sqrt(n_items).
+ANN_MIN_ITEMS = int(os.environ.get("ANN_MIN_ITEMS", 20000))
+ANN_N_LISTS = int(os.environ.get("ANN_N_LISTS", 0))
+ANN_N_PROBE = int(os.environ.get("ANN_N_PROBE", 8))
+# Top-N precomputed for every user after a retrain and served by lookup for
+# k <= TOP_N_WIDTH.
+TOP_N_PRECOMPUTE_ENABLED = os.environ.get("TOP_N_PRECOMPUTE_ENABLED", "1") == "1"
+TOP_N_WIDTH = int(os.environ.get("TOP_N_WIDTH", 100))
+TOP_N_BLOCK_SIZE = int(os.environ.get("TOP_N_BLOCK_SIZE", 256))
+TOP_N_JOBS = int(os.environ.get("TOP_N_JOBS", os.cpu_count() or 1))
+# Recommendation cache limits, how often (seconds) the latest model uuid of a
+# task type is checked, and the longest wait before retrying a failed load.
+SERVING_CACHE_MAX_ENTRIES = int(os.environ.get("SERVING_CACHE_MAX_ENTRIES", 100000))
+SERVING_CACHE_MAX_ITEMS = int(os.environ.get("SERVING_CACHE_MAX_ITEMS", 2000000))
+SERVING_MODEL_CHECK_INTERVAL = float(os.environ.get("SERVING_MODEL_CHECK_INTERVAL", 30))
+SERVING_MODEL_MAX_RETRY_DELAY = float(
+    os.environ.get("SERVING_MODEL_MAX_RETRY_DELAY", 600)
+)
+# Micro-batching of concurrent requests; a window of 0 scores every request
+# on its own.
+SERVING_BATCH_WINDOW_MS = float(os.environ.get("SERVING_BATCH_WINDOW_MS", 2))
+SERVING_BATCH_MAX_SIZE = int(os.environ.get("SERVING_BATCH_MAX_SIZE", 64))
@@ -0,0 +1,15 @@
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class RecommendedBook(BaseModel):
+    isbn: str
+    score: float
+
+
+class RecommendationDataModel(BaseModel):
+    user_id: int
+    task_type_id: int
+    model_uuid: UUID
+    recommendations: list[RecommendedBook]
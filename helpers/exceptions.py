@@ -14,3 +14,9 @@ class ESDBConnectionError(Exception):
     def __init__(self, message="ESDB connection error."):
         self.message = message
         super().__init__(self.message)
+
+
+class ModelSelectionError(Exception):
+    def __init__(self, message="No candidate model finished training."):
+        self.message = message
+        super().__init__(self.message)
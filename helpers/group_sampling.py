@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def sample_per_group(
+    group_codes: np.ndarray,
+    eligible: np.ndarray,
+    fraction: float,
+    seed: int | None = None,
+    min_per_group: int = 0,
+) -> np.ndarray:
+    # Picks int(n_eligible * fraction) random eligible rows of every group in one
+    # pass: after sorting by (group, eligibility, random key) the position of a row
+    # inside its group is its random rank among the group's eligible rows.
+    # Groups keep at least min_per_group eligible rows, as far as they have them.
+    group_codes = np.asarray(group_codes)
+    eligible = np.asarray(eligible, dtype=bool)
+    n_rows = len(group_codes)
+    if n_rows == 0:
+        return np.zeros(0, dtype=bool)
+
+    rng = np.random.default_rng(seed)
+    random_keys = rng.random(n_rows)
+
+    # Last key is the primary one: group, then eligible rows first, then random.
+    order = np.lexsort((random_keys, ~eligible, group_codes))
+    sorted_groups = group_codes[order]
+
+    group_starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, n_rows])
+    rank_in_group = np.arange(n_rows) - np.repeat(group_starts, group_sizes)
+
+    eligible_counts = np.add.reduceat(eligible[order].astype(np.int64), group_starts)
+    sample_counts = np.maximum(
+        (eligible_counts * fraction).astype(np.int64),
+        np.minimum(eligible_counts, min_per_group),
+    )
+
+    mask = np.zeros(n_rows, dtype=bool)
+    mask[order] = eligible[order] & (
+        rank_in_group < np.repeat(sample_counts, group_sizes)
+    )
+
+    return mask
@@ -0,0 +1,44 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+
+class SharedArrays:
+    # Copies NumPy arrays into named shared-memory blocks once. Worker processes
+    # attach to them by the picklable ``descriptor`` and get zero-copy views.
+
+    def __init__(self, arrays: dict[str, np.ndarray]) -> None:
+        self.__blocks: list[SharedMemory] = []
+        self.descriptor: dict[str, tuple[str, tuple, str]] = {}
+
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.__blocks.append(block)
+            self.descriptor[key] = (block.name, array.shape, array.dtype.str)
+
+    def close(self) -> None:
+        for block in self.__blocks:
+            block.close()
+            block.unlink()
+        self.__blocks = []
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @staticmethod
+    def attach(
+        descriptor: dict[str, tuple[str, tuple, str]],
+    ) -> tuple[dict[str, np.ndarray], list[SharedMemory]]:
+        # The blocks must stay referenced for as long as the views are used.
+        arrays, blocks = {}, []
+        for key, (name, shape, dtype) in descriptor.items():
+            block = SharedMemory(name=name)
+            arrays[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            blocks.append(block)
+
+        return arrays, blocks
@@ -3,6 +3,13 @@ from datetime import datetime, timezone
 
 from loguru import logger
 
+from configurations.config import (
+    TOP_N_BLOCK_SIZE,
+    TOP_N_JOBS,
+    TOP_N_PRECOMPUTE_ENABLED,
+    TOP_N_WIDTH,
+    TRAINING_CACHE_ENABLED,
+)
 from data_models.EventDataModel import EventDataModel
 from database.repositories.ModelConfigurationRepository import (
     ModelConfigurationRepository,
@@ -16,8 +23,11 @@ from database.repositories.ModelHyperparameterTypeRepository import (
 from database.repositories.ModelRepository import ModelRepository
 from database.repositories.ModelScoreRepository import ModelScoreRepository
 from database.repositories.ModelScoreTypeRepository import ModelScoreTypeRepository
+from serving.TopNPrecomputer import TopNPrecomputer
+from worker.operations.DataSplits import DataSplits
 from worker.operations.ModelTrainer import ModelTrainer
 from worker.operations.Preprocesor import Preprocesor
+from worker.operations.TrainingResultCache import TrainingResultCache
 
 
 class RecommendationService:
@@ -32,6 +42,10 @@ class RecommendationService:
         self._model_repo = ModelRepository()
         self._model_hyperparam_repo = ModelHyperparameterRepository()
         self._model_score_repo = ModelScoreRepository()
+        self._training_cache = TrainingResultCache()
+        self._top_n_precomputer = TopNPrecomputer(
+            width=TOP_N_WIDTH, block_size=TOP_N_BLOCK_SIZE, n_jobs=TOP_N_JOBS
+        )
 
     def __get_config_val(self) -> dict:
         configuration_dict = self._model_configuration_repo.get_model_config_dict(
@@ -90,10 +104,35 @@ class RecommendationService:
 
         logger.debug("Done")
 
+    def __train(self, configuration_dict: dict) -> dict:
+        data_splits: DataSplits = self._preprocesor.run(configuration_dict)
+        previous_model_uuid = self._model_repo.get_model_uuid(
+            self._model_trainer.task_type_id
+        )
+        train_result: dict = self._model_trainer.run(
+            data_splits, configuration_dict, previous_model_uuid
+        )
+
+        logger.debug("Done")
+
+        return train_result
+
     def run(self) -> None:
         configuration_dict: dict = self.__get_config_val()
-        dataframes: dict = self._preprocesor.run(configuration_dict)
-        train_result: dict = self._model_trainer.run(dataframes, configuration_dict)
+
+        # Unchanged data and configuration would only reproduce the same
+        # model, so the cached result is registered again instead.
+        train_result = None
+        if TRAINING_CACHE_ENABLED:
+            cache_key = self._training_cache.make_key(
+                configuration_dict, self._model_trainer.task_type_id
+            )
+            train_result = self._training_cache.load(cache_key)
+
+        if train_result is None:
+            train_result = self.__train(configuration_dict)
+            if TRAINING_CACHE_ENABLED:
+                self._training_cache.save(cache_key, train_result)
 
         model_uuid = train_result["model_uuid"]
         params = train_result["params"]
@@ -102,6 +141,12 @@ class RecommendationService:
 
         score_type_dict, hyperparameter_type_dict = self.__get_metadata_types()
 
+        # Serving picks a model up as soon as its Model row exists, so the
+        # top-N table is written first, with the threshold of the same
+        # configuration the row is inserted with.
+        if TOP_N_PRECOMPUTE_ENABLED:
+            self._top_n_precomputer.run(model_uuid, configuration_dict["Threshold"])
+
         self.__insert_metadata(
             model_uuid,
             params,
@@ -109,6 +154,8 @@ class RecommendationService:
             model_type_id,
             score_type_dict,
             hyperparameter_type_dict,
+            model_config_id=configuration_dict["Model_Configuration_Id"],
+            task_type_id=self._model_trainer.task_type_id,
         )
 
         logger.success("The task has been successfully completed.")
@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+
+class MicroBatcher:
+    # Collects concurrent requests for up to ``window`` seconds or
+    # ``max_size`` requests, whichever comes first, hands them to ``handler``
+    # as one list and fans the results back out to the waiting callers.
+
+    def __init__(
+        self,
+        handler: Callable[[list], list],
+        window: float = 0.002,
+        max_size: int = 64,
+        name: str = "micro-batcher",
+    ) -> None:
+        self.handler = handler
+        self.window = window
+        self.max_size = max(int(max_size), 1)
+
+        self.__queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.__lock = threading.Lock()
+        self.__batches = 0
+        self.__requests = 0
+        self.__wait_time = 0.0
+        # Batch sizes counted in power-of-two buckets: 1, 2, 3-4, 5-8, ...
+        self.__size_buckets = [0] * (self.max_size.bit_length() + 1)
+
+        self.__thread = threading.Thread(target=self.__run, name=name, daemon=True)
+        self.__thread.start()
+
+    def submit(self, request):
+        future = Future()
+        self.__queue.put((request, future, time.perf_counter()))
+        return future.result()
+
+    def __collect(self) -> list:
+        batch = [self.__queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.__queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def __run(self) -> None:
+        while True:
+            batch = self.__collect()
+            started = time.perf_counter()
+            requests = [request for request, _, _ in batch]
+            try:
+                results = self.handler(requests)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+
+            with self.__lock:
+                self.__batches += 1
+                self.__requests += len(batch)
+                self.__wait_time += sum(started - queued for _, _, queued in batch)
+                self.__size_buckets[(len(batch) - 1).bit_length()] += 1
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "window_ms": self.window * 1000,
+                "max_size": self.max_size,
+                "batches": self.__batches,
+                "requests": self.__requests,
+                "mean_size": self.__requests / self.__batches if self.__batches else 0,
+                "mean_wait_ms": (
+                    1000 * self.__wait_time / self.__requests if self.__requests else 0
+                ),
+                "size_buckets": {
+                    f"<={1 << bucket}": count
+                    for bucket, count in enumerate(self.__size_buckets)
+                    if count
+                },
+            }
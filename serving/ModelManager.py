@@ -0,0 +1,137 @@
+import threading
+import time
+import uuid
+from typing import Callable
+
+from loguru import logger
+
+from serving.ModelSource import ModelSource
+from serving.ServingModel import ServingModel
+
+
+class ModelManager:
+    # Owns the served model of every task type. A background thread polls for
+    # new Model rows, loads and warms the new artifact off the request path
+    # and then swaps the reference in one assignment: requests that already
+    # hold the old model finish on it, new requests get the new one. A model
+    # that fails to load is retried on later polls, waiting twice as long
+    # after every failure, up to ``max_retry_delay`` seconds.
+
+    def __init__(
+        self,
+        model_source: ModelSource | None = None,
+        poll_interval: float = 30.0,
+        max_retry_delay: float = 600.0,
+        on_swap: Callable[[int, ServingModel], None] | None = None,
+    ) -> None:
+        self._model_source = model_source or ModelSource()
+        self.poll_interval = poll_interval
+        self.max_retry_delay = max_retry_delay
+        self.on_swap = on_swap
+        self.task_type_ids: list[int] = []
+        self.swaps = 0
+
+        self.__models: dict[int, ServingModel] = {}
+        # task type -> (failed uuid, failures in a row, time of the next retry)
+        self.__failed: dict[int, tuple[uuid.UUID, int, float]] = {}
+        self.__load_lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+    def get(self, task_type_id: int) -> ServingModel | None:
+        return self.__models.get(task_type_id)
+
+    def models(self) -> dict[int, ServingModel]:
+        return dict(self.__models)
+
+    def load(
+        self, task_type_id: int, model_uuid: uuid.UUID | None = None
+    ) -> ServingModel | None:
+        # Loads, warms and swaps in a model; the current one keeps serving
+        # until the swap, and also if loading fails.
+        if task_type_id not in self.task_type_ids:
+            self.task_type_ids.append(task_type_id)
+
+        with self.__load_lock:
+            start = time.time()
+            if model_uuid is None:
+                model_uuid = self._model_source.latest_model_uuid(task_type_id)
+            if model_uuid is None:
+                logger.warning(f"No trained model for task type {task_type_id}.")
+                return None
+
+            try:
+                serving_model = self._model_source.load(model_uuid)
+                if serving_model is None:
+                    raise FileNotFoundError(f"Model {model_uuid} is not saved.")
+                serving_model.warm_up()
+            except Exception as e:
+                failures = self.__failures(task_type_id, model_uuid) + 1
+                delay = min(
+                    self.poll_interval * 2 ** (failures - 1), self.max_retry_delay
+                )
+                self.__failed[task_type_id] = (
+                    model_uuid,
+                    failures,
+                    time.monotonic() + delay,
+                )
+                logger.error(
+                    f"Loading model {model_uuid} failed ({failures} in a row), "
+                    f"retrying in {round(delay, 1)} sec.: {e}"
+                )
+                return None
+
+            self.__models[task_type_id] = serving_model
+            self.__failed.pop(task_type_id, None)
+            self.swaps += 1
+
+        logger.info(
+            f"Serving model {model_uuid} for task type {task_type_id}: "
+            f"{serving_model.n_users} users, {serving_model.n_items} books, "
+            f"loaded and warmed within {round(time.time() - start, 3)} sec."
+        )
+        if self.on_swap is not None:
+            self.on_swap(task_type_id, serving_model)
+
+        return serving_model
+
+    def __failures(self, task_type_id: int, model_uuid: uuid.UUID) -> int:
+        failed_uuid, failures, _ = self.__failed.get(task_type_id, (None, 0, 0.0))
+        return failures if failed_uuid == model_uuid else 0
+
+    def __retry_due(self, task_type_id: int, model_uuid: uuid.UUID) -> bool:
+        failed_uuid, _, retry_at = self.__failed.get(task_type_id, (None, 0, 0.0))
+        return failed_uuid != model_uuid or time.monotonic() >= retry_at
+
+    def poll(self) -> None:
+        for task_type_id in list(self.task_type_ids):
+            try:
+                latest_uuid = self._model_source.latest_model_uuid(task_type_id)
+            except Exception as e:
+                logger.error(f"Polling task type {task_type_id} failed: {e}")
+                continue
+
+            current = self.__models.get(task_type_id)
+            if latest_uuid is None or not self.__retry_due(task_type_id, latest_uuid):
+                continue
+            if current is None or current.model_uuid != latest_uuid:
+                self.load(task_type_id, latest_uuid)
+
+    def __run(self) -> None:
+        while not self.__stop.wait(self.poll_interval):
+            self.poll()
+
+    def start(self) -> None:
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self.__run, name="model-manager", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
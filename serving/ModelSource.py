@@ -0,0 +1,49 @@
+import uuid
+
+from loguru import logger
+
+from database.repositories.ModelConfigurationRepository import (
+    ModelConfigurationRepository,
+)
+from database.repositories.ModelRepository import ModelRepository
+from serving.ServingModel import ServingModel
+from serving.TopNStore import TopNStore
+from worker.operations.ModelSaver import ModelSaver
+
+
+class ModelSource:
+    # Where serving gets its models from: the latest Model row per task type,
+    # the saved artifact and its configured threshold.
+
+    def __init__(self) -> None:
+        self._model_repo = ModelRepository()
+        self._model_configuration_repo = ModelConfigurationRepository()
+        self._model_saver = ModelSaver()
+        self._top_n_store = TopNStore()
+
+    def latest_model_uuid(self, task_type_id: int) -> uuid.UUID | None:
+        return self._model_repo.get_model_uuid(task_type_id)
+
+    def load(
+        self, model_uuid: uuid.UUID, threshold: float | None = None
+    ) -> ServingModel | None:
+        # ``threshold`` is read from the model's configuration unless given,
+        # e.g. before the Model row exists.
+        model = self._model_saver.get_model(model_uuid)
+        if model is None:
+            logger.warning(f"Model {model_uuid} has no saved artifact.")
+            return None
+
+        if threshold is None:
+            threshold = self._model_configuration_repo.get_threshold(model_uuid)
+        serving_model = ServingModel(
+            model_uuid=model_uuid,
+            model=model,
+            seen_items=self._model_saver.get_seen_items(model_uuid),
+            threshold=threshold,
+            ann_index=self._model_saver.get_ann_index(model_uuid),
+            top_n=self._top_n_store.load(model_uuid),
+        )
+        logger.debug("Done")
+
+        return serving_model
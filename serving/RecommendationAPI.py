@@ -0,0 +1,60 @@
+from contextlib import asynccontextmanager
+
+import init
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query, Request
+
+from configurations.config import (
+    SERVING_DEFAULT_K,
+    SERVING_HOST,
+    SERVING_MAX_K,
+    SERVING_PORT,
+    SERVING_TASK_TYPE_IDS,
+)
+from data_models.RecommendationDataModel import RecommendationDataModel
+from helpers.exceptions import ValueNotFoundError
+from serving.RecommendationEngine import RecommendationEngine
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models are loaded once at startup, not per request; newer ones are
+    # picked up in the background.
+    engine = RecommendationEngine()
+    for task_type_id in SERVING_TASK_TYPE_IDS:
+        engine.load(task_type_id)
+    engine.start()
+    app.state.engine = engine
+
+    yield
+
+    engine.stop()
+
+
+app = FastAPI(title="Books recommendation", lifespan=lifespan)
+
+
+# A sync endpoint: FastAPI runs it in its thread pool and the NumPy scoring
+# releases the GIL, so concurrent requests do not queue behind each other.
+@app.get("/recommendations/{user_id}", response_model=RecommendationDataModel)
+def get_recommendations(
+    request: Request,
+    user_id: int,
+    k: int = Query(SERVING_DEFAULT_K, ge=1, le=SERVING_MAX_K),
+    task_type_id: int = SERVING_TASK_TYPE_IDS[0],
+) -> dict:
+    engine: RecommendationEngine = request.app.state.engine
+    try:
+        return engine.recommend(task_type_id, user_id, k)
+    except ValueNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+
+
+@app.get("/metrics")
+def get_metrics(request: Request) -> dict:
+    engine: RecommendationEngine = request.app.state.engine
+    return engine.metrics()
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=SERVING_HOST, port=SERVING_PORT)
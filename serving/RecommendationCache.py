@@ -0,0 +1,100 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+
+class RecommendationCache:
+    # Bounded LRU cache of recommendation responses keyed by
+    # (task type, model uuid, user, k). The model uuid in the key means an
+    # entry can never outlive its model; invalidate() frees a replaced
+    # model's entries right away instead of waiting for them to age out.
+    # Limits are on the number of entries and on the recommended books held.
+
+    def __init__(self, max_entries: int = 100_000, max_items: int = 2_000_000):
+        self.max_entries = max_entries
+        self.max_items = max_items
+        self.__entries: OrderedDict[tuple, dict] = OrderedDict()
+        self.__n_items = 0
+        self.__lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @staticmethod
+    def __size(response: dict) -> int:
+        return max(len(response["recommendations"]), 1)
+
+    def get(
+        self, task_type_id: int, model_uuid: uuid.UUID, user_id: int, k: int
+    ) -> dict | None:
+        key = (task_type_id, model_uuid, user_id, k)
+        with self.__lock:
+            response = self.__entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+
+            self.__entries.move_to_end(key)
+            self.hits += 1
+
+        return response
+
+    def put(
+        self,
+        task_type_id: int,
+        model_uuid: uuid.UUID,
+        user_id: int,
+        k: int,
+        response: dict,
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+
+        key = (task_type_id, model_uuid, user_id, k)
+        with self.__lock:
+            previous = self.__entries.pop(key, None)
+            if previous is not None:
+                self.__n_items -= self.__size(previous)
+            self.__entries[key] = response
+            self.__n_items += self.__size(response)
+
+            while len(self.__entries) > self.max_entries or (
+                self.__n_items > self.max_items and len(self.__entries) > 1
+            ):
+                _, evicted = self.__entries.popitem(last=False)
+                self.__n_items -= self.__size(evicted)
+                self.evictions += 1
+
+    def invalidate(self, task_type_id: int, keep_model_uuid=None) -> int:
+        # Drops the entries of a task type, except those of ``keep_model_uuid``.
+        with self.__lock:
+            stale_keys = [
+                key
+                for key in self.__entries
+                if key[0] == task_type_id and key[1] != keep_model_uuid
+            ]
+            for key in stale_keys:
+                self.__n_items -= self.__size(self.__entries.pop(key))
+            self.invalidations += len(stale_keys)
+
+        return len(stale_keys)
+
+    def stats(self) -> dict:
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.__entries),
+                "items": self.__n_items,
+                "max_entries": self.max_entries,
+                "max_items": self.max_items,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
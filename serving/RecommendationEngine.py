@@ -0,0 +1,162 @@
+import threading
+
+import numpy as np
+from loguru import logger
+
+from configurations.config import (
+    SERVING_BATCH_MAX_SIZE,
+    SERVING_BATCH_WINDOW_MS,
+    SERVING_CACHE_MAX_ENTRIES,
+    SERVING_CACHE_MAX_ITEMS,
+    SERVING_MODEL_CHECK_INTERVAL,
+    SERVING_MODEL_MAX_RETRY_DELAY,
+)
+from helpers.exceptions import ValueNotFoundError
+from serving.MicroBatcher import MicroBatcher
+from serving.ModelManager import ModelManager
+from serving.ModelSource import ModelSource
+from serving.RecommendationCache import RecommendationCache
+from serving.ServingModel import ServingModel
+
+
+class RecommendationEngine:
+    # Answers top-N requests from the models held by a ModelManager, through a
+    # response cache. The manager polls for new models every
+    # ``check_interval`` seconds on its own thread; when it swaps one in, the
+    # cache entries of the old model are dropped. Cache misses that arrive
+    # within ``batch_window`` seconds of each other are scored together as one
+    # user block.
+
+    def __init__(
+        self,
+        model_source: ModelSource | None = None,
+        cache: RecommendationCache | None = None,
+        check_interval: float = SERVING_MODEL_CHECK_INTERVAL,
+        max_retry_delay: float = SERVING_MODEL_MAX_RETRY_DELAY,
+        batch_window: float = SERVING_BATCH_WINDOW_MS / 1000,
+        batch_max_size: int = SERVING_BATCH_MAX_SIZE,
+    ) -> None:
+        if cache is None:
+            cache = RecommendationCache(
+                max_entries=SERVING_CACHE_MAX_ENTRIES,
+                max_items=SERVING_CACHE_MAX_ITEMS,
+            )
+        self.cache = cache
+        self.model_manager = ModelManager(
+            model_source=model_source,
+            poll_interval=check_interval,
+            max_retry_delay=max_retry_delay,
+            on_swap=self.__on_swap,
+        )
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+        self.__batchers: dict[int, MicroBatcher] = {}
+        self.__batchers_lock = threading.Lock()
+
+    def __on_swap(self, task_type_id: int, serving_model: ServingModel) -> None:
+        n_dropped = self.cache.invalidate(
+            task_type_id, keep_model_uuid=serving_model.model_uuid
+        )
+        logger.debug(f"{n_dropped} cached responses dropped.")
+
+    def load(self, task_type_id: int) -> ServingModel | None:
+        return self.model_manager.load(task_type_id)
+
+    def start(self) -> None:
+        self.model_manager.start()
+
+    def stop(self) -> None:
+        self.model_manager.stop()
+
+    def get_model(self, task_type_id: int) -> ServingModel:
+        serving_model = self.model_manager.get(task_type_id)
+        if serving_model is None:
+            raise ValueNotFoundError(
+                f"No model is loaded for task type {task_type_id}."
+            )
+
+        return serving_model
+
+    @staticmethod
+    def __top_k_batch(requests: list[tuple[ServingModel, int, int]]) -> list:
+        # A window may straddle a model swap: one user block per model, scored
+        # for the largest k and cut per request.
+        results = [None] * len(requests)
+        positions_by_model: dict[int, list[int]] = {}
+        for position, (serving_model, _, _) in enumerate(requests):
+            positions_by_model.setdefault(id(serving_model), []).append(position)
+
+        for positions in positions_by_model.values():
+            serving_model = requests[positions[0]][0]
+            user_codes = np.array(
+                [requests[position][1] for position in positions], dtype=np.int32
+            )
+            k = max(requests[position][2] for position in positions)
+            for position, (items, scores) in zip(
+                positions, serving_model.top_k(user_codes, k)
+            ):
+                request_k = requests[position][2]
+                results[position] = (items[:request_k], scores[:request_k])
+
+        return results
+
+    def __get_batcher(self, task_type_id: int) -> MicroBatcher | None:
+        if self.batch_window <= 0 or self.batch_max_size <= 1:
+            return None
+
+        batcher = self.__batchers.get(task_type_id)
+        if batcher is None:
+            with self.__batchers_lock:
+                batcher = self.__batchers.get(task_type_id)
+                if batcher is None:
+                    batcher = MicroBatcher(
+                        self.__top_k_batch,
+                        window=self.batch_window,
+                        max_size=self.batch_max_size,
+                        name=f"micro-batcher-{task_type_id}",
+                    )
+                    self.__batchers[task_type_id] = batcher
+
+        return batcher
+
+    def recommend(self, task_type_id: int, user_id: int, k: int) -> dict:
+        # The model reference is taken once, so a swap in the middle of the
+        # request does not mix two models.
+        serving_model = self.get_model(task_type_id)
+
+        response = self.cache.get(task_type_id, serving_model.model_uuid, user_id, k)
+        if response is not None:
+            return response
+
+        user_code = int(serving_model.encode_users([user_id])[0])
+        batcher = self.__get_batcher(task_type_id)
+        if batcher is not None:
+            items, scores = batcher.submit((serving_model, user_code, k))
+        else:
+            items, scores = serving_model.top_k(np.array([user_code]), k)[0]
+        response = {
+            "user_id": user_id,
+            "task_type_id": task_type_id,
+            "model_uuid": serving_model.model_uuid,
+            "recommendations": [
+                {"isbn": isbn, "score": float(score)}
+                for isbn, score in zip(serving_model.isbns[items], scores)
+            ],
+        }
+        self.cache.put(task_type_id, serving_model.model_uuid, user_id, k, response)
+
+        return response
+
+    def metrics(self) -> dict:
+        return {
+            "models": {
+                task_type_id: str(serving_model.model_uuid)
+                for task_type_id, serving_model in self.model_manager.models().items()
+            },
+            "model_swaps": self.model_manager.swaps,
+            "cache": self.cache.stats(),
+            "batching": {
+                task_type_id: batcher.stats()
+                for task_type_id, batcher in self.__batchers.items()
+            },
+        }
@@ -0,0 +1,249 @@
+import uuid
+
+import numpy as np
+from pandas import Index
+from scipy.sparse import csr_matrix
+from surprise import Trainset
+from surprise.prediction_algorithms.algo_base import AlgoBase
+
+from serving.TopNStore import TopNTable
+from worker.operations.ml_models.FactorModel import FactorModel
+from worker.operations.ml_models.ItemKNNIndex import ItemKNNIndex
+from worker.operations.ml_models.IVFIndex import IVFIndex
+
+
+class ServingModel:
+    # A saved model prepared for online top-N: block scoring of all books for
+    # a set of users (sparse products for item-KNN models), raw id lookup,
+    # the books each user already rated and the configured score threshold.
+    # Users are served from the precomputed top-N table when there is one;
+    # otherwise factor models saved with an IVF index only score the books of
+    # the probed lists.
+    top_k_chunk_size = 256
+
+    def __init__(
+        self,
+        model_uuid: uuid.UUID,
+        model,
+        seen_items: csr_matrix | None = None,
+        threshold: float | None = None,
+        ann_index: IVFIndex | None = None,
+        top_n: TopNTable | None = None,
+    ) -> None:
+        if isinstance(model, AlgoBase):
+            if seen_items is None:
+                seen_items = self.__seen_from_trainset(model.trainset)
+            model = FactorModel.from_surprise(model)
+
+        self.model_uuid = model_uuid
+        self.model = model
+        self.user_ids = np.asarray(model.user_ids)
+        self.isbns = np.asarray(model.isbns).astype(str)
+        self.threshold = threshold
+        self.ann_index = ann_index if isinstance(model, FactorModel) else None
+        self.top_n = top_n
+        self.known_items = np.asarray(
+            getattr(model, "known_items", np.ones(self.n_items, dtype=bool))
+        )
+
+        if seen_items is None:
+            seen_items = csr_matrix((self.n_users, self.n_items), dtype=np.float32)
+        self.seen_items = seen_items.tocsr()
+        self.__user_index = Index(self.user_ids)
+        # Item side of the factor product, set up by warm_up().
+        self.__item_matrix: np.ndarray | None = None
+        self.__item_offsets: np.ndarray | None = None
+
+    @staticmethod
+    def __seen_from_trainset(trainset: Trainset) -> csr_matrix:
+        user_codes, item_codes = [], []
+        for inner_uid, user_ratings in trainset.ur.items():
+            user_codes.extend([inner_uid] * len(user_ratings))
+            item_codes.extend(inner_iid for inner_iid, _ in user_ratings)
+
+        return csr_matrix(
+            (np.ones(len(user_codes), dtype=np.float32), (user_codes, item_codes)),
+            shape=(trainset.n_users, trainset.n_items),
+        )
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.isbns)
+
+    def encode_users(self, user_ids) -> np.ndarray:
+        # Unknown users are encoded as -1 and get the model's cold-start scores.
+        return self.__user_index.get_indexer(user_ids).astype(np.int32)
+
+    def warm_up(self) -> None:
+        # Builds everything that is otherwise built lazily by the first
+        # requests: the user id hash table, the item side of the factor
+        # product with unknown books masked out and transposed for the matrix
+        # product, canonical seen-item rows, and one scoring pass.
+        self.__user_index.get_indexer(self.user_ids[:1])
+        self.seen_items.sum_duplicates()
+
+        if isinstance(self.model, FactorModel):
+            model = self.model
+            # Row-major (n_items, n_factors): BLAS reads it transposed faster
+            # than a transposed copy.
+            self.__item_matrix = np.ascontiguousarray(
+                model.item_factors * model.known_items[:, None], dtype=np.float32
+            )
+            self.__item_offsets = (
+                model.global_mean + model.item_bias * model.known_items
+            ).astype(np.float32)
+
+        self.top_k(np.array([-1] + [0] * (self.n_users > 0), dtype=np.int32), 1)
+
+    def score(self, user_codes: np.ndarray) -> np.ndarray:
+        user_codes = np.asarray(user_codes)
+        if self.__item_matrix is not None:
+            # FactorModel.score_all() with the item side prepared.
+            model = self.model
+            known_user = user_codes >= 0
+            known_user[known_user] = model.known_users[user_codes[known_user]]
+            users = np.where(known_user, user_codes, 0)
+
+            scores = (model.user_factors[users] * known_user[:, None]) @ (
+                self.__item_matrix.T
+            )
+            scores += self.__item_offsets
+            scores += (model.user_bias[users] * known_user)[:, None]
+            return np.clip(scores, *model.rating_scale, out=scores)
+        if isinstance(self.model, (FactorModel, ItemKNNIndex)):
+            return self.model.score_all(user_codes)
+
+        # Other models only expose pairwise predict(); still one call per block.
+        item_codes = np.arange(self.n_items)
+        est = self.model.predict(
+            np.repeat(user_codes, self.n_items), np.tile(item_codes, len(user_codes))
+        )
+        return est.reshape(len(user_codes), self.n_items).astype(np.float32)
+
+    def seen_entries(self, user_codes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # (row in user_codes, item code) of every book the users already rated.
+        user_codes = np.asarray(user_codes)
+        rows = np.flatnonzero(user_codes >= 0)
+        indptr = self.seen_items.indptr
+        starts = indptr[user_codes[rows]]
+        lengths = indptr[user_codes[rows] + 1] - starts
+
+        entry_rows = np.repeat(rows, lengths)
+        offsets = np.arange(len(entry_rows)) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        entries = np.repeat(starts, lengths) + offsets
+
+        return entry_rows, self.seen_items.indices[entries]
+
+    @classmethod
+    def __top_k_columns(cls, scores: np.ndarray, k: int) -> np.ndarray:
+        # Columns of the k largest scores of every row, unordered. The rows are
+        # cut into chunks: the k largest scores lie in the k chunks with the
+        # largest maxima, so only those k * chunk_size scores are partitioned.
+        n_rows, n_columns = scores.shape
+        chunk_size = cls.top_k_chunk_size
+        n_full_chunks = n_columns // chunk_size
+        if n_full_chunks <= k:
+            return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        head = scores[:, : n_full_chunks * chunk_size]
+        chunk_maxima = head.reshape(n_rows, n_full_chunks, chunk_size).max(axis=2)
+        if n_columns > n_full_chunks * chunk_size:
+            tail_maxima = scores[:, n_full_chunks * chunk_size :].max(axis=1)
+            chunk_maxima = np.hstack([chunk_maxima, tail_maxima[:, None]])
+
+        top_chunks = np.argpartition(-chunk_maxima, k - 1, axis=1)[:, :k]
+        columns = top_chunks[:, :, None] * chunk_size + np.arange(chunk_size)
+        columns = columns.reshape(n_rows, -1)
+        # The tail chunk is short: its missing columns never win.
+        in_range = columns < n_columns
+        columns = np.where(in_range, columns, 0)
+        candidates = np.where(
+            in_range, np.take_along_axis(scores, columns, axis=1), -np.inf
+        )
+        top = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+
+        return np.take_along_axis(columns, top, axis=1)
+
+    def top_k_from_scores(
+        self, user_codes: np.ndarray, scores: np.ndarray, k: int
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        # Masks unknown and already rated books and scores under the threshold
+        # in place, then returns (item codes, scores), best first, per user.
+        scores[:, ~self.known_items] = -np.inf
+        scores[self.seen_entries(user_codes)] = -np.inf
+        if self.threshold is not None:
+            scores[scores < self.threshold] = -np.inf
+
+        k = min(k, self.n_items)
+        top = self.__top_k_columns(scores, k)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        results = []
+        for items, item_scores in zip(top, top_scores):
+            valid = np.isfinite(item_scores)
+            results.append((items[valid], item_scores[valid]))
+
+        return results
+
+    def __approximate_top_k(
+        self, user_codes: np.ndarray, k: int
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        # Queries are [p_u, 1]; unknown users only rank by the item biases.
+        known_user = user_codes >= 0
+        known_user[known_user] = self.model.known_users[user_codes[known_user]]
+        users = np.where(known_user, user_codes, 0)
+        queries = np.hstack(
+            [
+                self.model.user_factors[users] * known_user[:, None],
+                np.ones((len(users), 1), dtype=np.float32),
+            ]
+        )
+
+        indptr = self.seen_items.indptr
+        results = []
+        candidates = self.ann_index.candidates(queries)
+        for user_code, (items, _) in zip(user_codes, candidates):
+            scores = self.model.predict(np.full(len(items), user_code), items)
+            excluded = np.zeros(len(items), dtype=bool)
+            if user_code >= 0:
+                seen = self.seen_items.indices[
+                    indptr[user_code] : indptr[user_code + 1]
+                ]
+                excluded |= np.isin(items, seen)
+            if self.threshold is not None:
+                excluded |= scores < self.threshold
+
+            # Too few candidates left in the probed lists: score exactly.
+            if len(items) - excluded.sum() < k:
+                results.extend(
+                    self.top_k_from_scores(
+                        user_code[None], self.score(user_code[None]), k
+                    )
+                )
+                continue
+
+            items, scores = items[~excluded], scores[~excluded].astype(np.float32)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            results.append((items[top], scores[top]))
+
+        return results
+
+    def top_k(
+        self, user_codes: np.ndarray, k: int
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        user_codes = np.asarray(user_codes)
+        if self.top_n is not None and k <= self.top_n.width:
+            return [self.top_n.lookup(user_code, k) for user_code in user_codes]
+        if self.ann_index is not None:
+            return self.__approximate_top_k(user_codes, k)
+        return self.top_k_from_scores(user_codes, self.score(user_codes), k)
@@ -0,0 +1,164 @@
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from loguru import logger
+from scipy.sparse import csr_matrix
+
+from helpers.shared_arrays import SharedArrays
+from serving.ModelSource import ModelSource
+from serving.ServingModel import ServingModel
+from serving.TopNStore import TopNStore
+from worker.operations.ml_models.FactorModel import FactorModel
+
+# Per-process state of pool workers, set once by _attach_worker().
+_worker_state: dict = {}
+
+
+class TopNPrecomputer:
+    # Scores every user against every book after a retrain and keeps the top
+    # ``width`` per user in a TopNStore. User blocks are scored as one matrix
+    # product each; for factor models the blocks are spread over worker
+    # processes that share the model through shared memory and write straight
+    # into the memory-mapped output.
+
+    def __init__(
+        self,
+        width: int = 100,
+        block_size: int = 256,
+        n_jobs: int = 1,
+        store: TopNStore | None = None,
+        model_source: ModelSource | None = None,
+    ) -> None:
+        self.width = width
+        self.block_size = block_size
+        self.n_jobs = max(int(n_jobs), 1)
+        self._store = store or TopNStore()
+        self._model_source = model_source
+
+    @staticmethod
+    def _attach_worker(
+        descriptor: dict,
+        global_mean: float,
+        rating_scale: tuple[float, float],
+        threshold: float | None,
+        tmp_paths: tuple[str, str],
+    ) -> None:
+        arrays, blocks = SharedArrays.attach(descriptor)
+        n_users, n_items = len(arrays["user_bias"]), len(arrays["item_bias"])
+        model = FactorModel(
+            global_mean=global_mean,
+            user_bias=arrays["user_bias"],
+            item_bias=arrays["item_bias"],
+            user_factors=arrays["user_factors"],
+            item_factors=arrays["item_factors"],
+            user_ids=np.arange(n_users),
+            isbns=np.arange(n_items),
+            rating_scale=rating_scale,
+            known_users=arrays["known_users"],
+            known_items=arrays["known_items"],
+        )
+        seen_items = csr_matrix(
+            (
+                np.ones(len(arrays["seen_indices"]), dtype=np.float32),
+                arrays["seen_indices"],
+                arrays["seen_indptr"],
+            ),
+            shape=(n_users, n_items),
+        )
+        _worker_state.update(
+            blocks=blocks,
+            serving_model=ServingModel(None, model, seen_items, threshold),
+            tables=tuple(np.load(path, mmap_mode="r+") for path in tmp_paths),
+        )
+
+    @staticmethod
+    def _score_block(start: int, stop: int) -> None:
+        serving_model: ServingModel = _worker_state["serving_model"]
+        items_table, scores_table = _worker_state["tables"]
+        width = items_table.shape[1]
+
+        # Codes past the last user are the unknown-user row.
+        user_codes = np.arange(start, stop, dtype=np.int32)
+        user_codes[user_codes >= serving_model.n_users] = -1
+
+        results = serving_model.top_k(user_codes, width)
+        for row, (items, scores) in enumerate(results, start=start):
+            items_table[row, : len(items)] = items
+            scores_table[row, : len(scores)] = scores
+
+    @staticmethod
+    def __shared_model(serving_model: ServingModel) -> SharedArrays:
+        model: FactorModel = serving_model.model
+        return SharedArrays(
+            {
+                "user_bias": model.user_bias,
+                "item_bias": model.item_bias,
+                "user_factors": model.user_factors,
+                "item_factors": model.item_factors,
+                "known_users": model.known_users,
+                "known_items": model.known_items,
+                "seen_indptr": serving_model.seen_items.indptr,
+                "seen_indices": serving_model.seen_items.indices,
+            }
+        )
+
+    def run(self, model_uuid: uuid.UUID, threshold: float | None = None) -> None:
+        # Run before the model's Model row is inserted, so serving never loads
+        # the model without its table; the threshold is then passed in.
+        if self._store.exists(model_uuid):
+            logger.debug(f"Top-N table of model {model_uuid} already exists.")
+            return
+
+        start = time.time()
+        model_source = self._model_source or ModelSource()
+        serving_model = model_source.load(model_uuid, threshold)
+        if serving_model is None:
+            return
+        # Exact scores only; the ANN index is for per-request scoring.
+        serving_model.ann_index = None
+        serving_model.top_n = None
+
+        n_rows = serving_model.n_users + 1
+        tmp_paths = self._store.create(model_uuid, n_rows, self.width)
+        user_blocks = [
+            (block_start, min(block_start + self.block_size, n_rows))
+            for block_start in range(0, n_rows, self.block_size)
+        ]
+
+        if self.n_jobs == 1 or not isinstance(serving_model.model, FactorModel):
+            _worker_state.update(
+                serving_model=serving_model,
+                tables=tuple(np.load(path, mmap_mode="r+") for path in tmp_paths),
+            )
+            try:
+                for block_start, block_stop in user_blocks:
+                    self._score_block(block_start, block_stop)
+            finally:
+                _worker_state.clear()
+        else:
+            shared = self.__shared_model(serving_model)
+            initargs = (
+                shared.descriptor,
+                serving_model.model.global_mean,
+                serving_model.model.rating_scale,
+                serving_model.threshold,
+                tmp_paths,
+            )
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=self.n_jobs,
+                    initializer=self._attach_worker,
+                    initargs=initargs,
+                ) as executor:
+                    list(executor.map(self._score_block, *zip(*user_blocks)))
+            finally:
+                shared.close()
+
+        self._store.commit(model_uuid)
+
+        logger.info(
+            f"Top-{self.width} of {serving_model.n_users} users precomputed on "
+            f"{self.n_jobs} workers within {round(time.time() - start, 3)} sec."
+        )
@@ -0,0 +1,76 @@
+import os
+import uuid
+
+import numpy as np
+from loguru import logger
+
+
+class TopNTable:
+    # Precomputed top-N of one model: row u holds the best books of user code
+    # u, best first, padded with -1; the last row is for unknown users.
+
+    def __init__(self, items: np.ndarray, scores: np.ndarray) -> None:
+        self.items = items
+        self.scores = scores
+
+    @property
+    def width(self) -> int:
+        return self.items.shape[1]
+
+    def lookup(self, user_code: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+        row = user_code if user_code >= 0 else len(self.items) - 1
+        items = self.items[row, :k]
+        n_valid = int(np.count_nonzero(items >= 0))
+
+        return items[:n_valid], self.scores[row, :n_valid]
+
+
+class TopNStore:
+    # Fixed-width .npy files next to the saved model, versioned by its uuid:
+    # <uuid>.topn.items.npy (int32) and <uuid>.topn.scores.npy (float32).
+    # Readers map them read-only, so serving processes share the pages.
+
+    def __init__(self, directory: str | None = None) -> None:
+        if directory is None:
+            directory = os.path.join(os.path.dirname(os.getcwd()), "saved_models")
+        self.directory = directory
+
+    def __paths(self, model_uuid: uuid.UUID) -> tuple[str, str]:
+        prefix = os.path.join(self.directory, str(model_uuid) + ".topn")
+        return prefix + ".items.npy", prefix + ".scores.npy"
+
+    def exists(self, model_uuid: uuid.UUID) -> bool:
+        return all(os.path.exists(path) for path in self.__paths(model_uuid))
+
+    def create(self, model_uuid: uuid.UUID, n_rows: int, width: int) -> tuple[str, str]:
+        # Empty temporary files to be filled in place (possibly by several
+        # processes) and published with commit().
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_paths = tuple(path + ".tmp" for path in self.__paths(model_uuid))
+        for path, dtype, fill_value in zip(
+            tmp_paths, (np.int32, np.float32), (-1, np.nan)
+        ):
+            array = np.lib.format.open_memmap(
+                path, mode="w+", dtype=dtype, shape=(n_rows, width)
+            )
+            array[...] = fill_value
+            array.flush()
+            del array
+
+        return tmp_paths
+
+    def commit(self, model_uuid: uuid.UUID) -> None:
+        for path in self.__paths(model_uuid):
+            os.replace(path + ".tmp", path)
+
+        logger.debug("The top-N table was saved locally.")
+
+    def load(self, model_uuid: uuid.UUID) -> TopNTable | None:
+        if not self.exists(model_uuid):
+            return None
+
+        items_path, scores_path = self.__paths(model_uuid)
+        return TopNTable(
+            items=np.load(items_path, mmap_mode="r"),
+            scores=np.load(scores_path, mmap_mode="r"),
+        )
@@ -0,0 +1,5 @@
+import os
+import sys
+
+cwd = os.getcwd()
+sys.path.append(cwd)
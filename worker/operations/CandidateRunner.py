@@ -0,0 +1,172 @@
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from multiprocessing.connection import Connection, wait
+
+from loguru import logger
+
+from worker.operations.DataSplits import DataSplits
+
+
+def _on_sigterm(candidate_pid: int):
+    # The candidate exits through SystemExit; processes it forked (e.g. pool
+    # workers, which inherit the handler) exit right away instead of
+    # reporting SystemExit as a task error and taking the next task.
+    def handler(*_) -> None:
+        if os.getpid() == candidate_pid:
+            sys.exit(1)
+        os._exit(1)
+
+    return handler
+
+
+def _run_candidate(
+    model_class, state: dict, configuration_dict: dict, connection: Connection
+) -> None:
+    # Worker entry point: one candidate's fit_and_validate() over the shared
+    # splits. Only params and metrics travel back to the parent. Cancellation
+    # (SIGTERM) exits through SystemExit so the candidate's own cleanup, e.g.
+    # of shared memory, still runs. The worker leads its own process group, so
+    # cancelling also reaches the processes it starts, e.g. grid search pools.
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, _on_sigterm(os.getpid()))
+    try:
+        data_splits = DataSplits.attach(state)
+        result = model_class().fit_and_validate(data_splits, configuration_dict)
+        connection.send({"params": result["params"], "metrics": result["metrics"]})
+    except Exception as e:
+        connection.send({"error": repr(e)})
+    finally:
+        connection.close()
+
+
+class CandidateRunner:
+    # Runs candidate I_Model classes in separate processes, at most n_jobs at a
+    # time. The preprocessed splits are put in shared memory once and every
+    # worker attaches to them. A candidate running longer than time_budget
+    # seconds is terminated and left out of the results; whatever is left of
+    # its process group kill_timeout seconds later is killed.
+    poll_interval = 0.5
+    kill_timeout = 5.0
+
+    def __init__(self, n_jobs: int, time_budget: float | None = None) -> None:
+        self.n_jobs = max(int(n_jobs), 1)
+        self.time_budget = time_budget
+
+    def __start(
+        self, model_class, state: dict, configuration_dict: dict
+    ) -> tuple[multiprocessing.Process, Connection, float]:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        # Not a daemon, so candidates may run their own process pools.
+        process = multiprocessing.Process(
+            target=_run_candidate,
+            args=(model_class, state, configuration_dict, sender),
+            name=model_class.__name__,
+        )
+        process.start()
+        sender.close()
+        # Also set here, so the group exists even if the candidate is cancelled
+        # before it got to do it.
+        try:
+            os.setpgid(process.pid, process.pid)
+        except OSError:
+            pass
+
+        return process, receiver, time.time()
+
+    @staticmethod
+    def __signal_group(process: multiprocessing.Process, signum: int) -> None:
+        try:
+            os.killpg(process.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def __stop(self, process: multiprocessing.Process) -> None:
+        self.__signal_group(process, signal.SIGTERM)
+        process.join(self.kill_timeout)
+        self.__signal_group(process, signal.SIGKILL)
+        process.join()
+
+    def __poll(self, model_class, process, receiver, started) -> dict | None:
+        # Returns the finished result, {} for a failed or cancelled candidate,
+        # or None while it is still running within budget.
+        name = model_class.__name__
+        elapsed = time.time() - started
+        # Checked before the pipe: a worker that sends its result and exits
+        # between the two checks still has its result read below.
+        exited = not process.is_alive()
+
+        if receiver.poll():
+            try:
+                result = receiver.recv()
+            except EOFError:
+                result = {"error": "worker exited without a result"}
+            process.join()
+
+            if "error" in result:
+                logger.error(f"Candidate {name} failed: {result['error']}")
+                return {}
+
+            logger.info(
+                f"Candidate {name}: {round(result['metrics']['RMSE'], 4)} RMSE "
+                f"within {round(elapsed, 3)} sec."
+            )
+            return {"model_class": model_class, **result}
+
+        if exited:
+            logger.error(f"Candidate {name} exited with code {process.exitcode}.")
+            return {}
+
+        if self.time_budget is not None and elapsed > self.time_budget:
+            self.__stop(process)
+            logger.warning(
+                f"Candidate {name} cancelled after exceeding its "
+                f"{self.time_budget} sec. budget."
+            )
+            return {}
+
+        return None
+
+    def run(
+        self, model_classes: list, data_splits: DataSplits, configuration_dict: dict
+    ) -> list[dict]:
+        start = time.time()
+        pending = list(model_classes)
+        running: dict = {}
+        results = []
+        shared, state = data_splits.share()
+
+        try:
+            while pending or running:
+                while pending and len(running) < self.n_jobs:
+                    model_class = pending.pop(0)
+                    running[model_class] = self.__start(
+                        model_class, state, configuration_dict
+                    )
+
+                wait(
+                    [receiver for _, receiver, _ in running.values()],
+                    timeout=self.poll_interval,
+                )
+
+                for model_class, (process, receiver, started) in list(running.items()):
+                    result = self.__poll(model_class, process, receiver, started)
+                    if result is not None:
+                        del running[model_class]
+                        receiver.close()
+                        if result:
+                            results.append(result)
+        finally:
+            for process, receiver, _ in running.values():
+                self.__stop(process)
+                receiver.close()
+            shared.close()
+
+        logger.info(
+            f"{len(results)} of {len(model_classes)} candidates finished on "
+            f"{self.n_jobs} workers within {round(time.time() - start, 3)} sec."
+        )
+
+        return results
@@ -0,0 +1,90 @@
+import numpy as np
+
+from helpers.shared_arrays import SharedArrays
+from worker.operations.RatingMatrix import RatingMatrix
+
+
+class DataSplits:
+    # One ratings table ordered as [train | validation | test], so every split,
+    # including train_validate and full, is a contiguous slice. Split arrays are
+    # NumPy views of the shared table and never copies.
+    split_names = (
+        "train_data",
+        "validation_data",
+        "train_validate_data",
+        "test_data",
+        "full_data",
+    )
+
+    def __init__(self, rating_matrix: RatingMatrix, bounds: dict[str, slice]) -> None:
+        self.rating_matrix = rating_matrix
+        self.__bounds = bounds
+        self.__shared_blocks: list = []
+
+    @classmethod
+    def from_rows(
+        cls,
+        rating_matrix: RatingMatrix,
+        train_rows: np.ndarray,
+        validation_rows: np.ndarray,
+        test_rows: np.ndarray,
+    ) -> "DataSplits":
+        order = np.concatenate([train_rows, validation_rows, test_rows])
+        n_train = len(train_rows)
+        n_train_validate = n_train + len(validation_rows)
+        n_full = len(order)
+
+        bounds = {
+            "train_data": slice(0, n_train),
+            "validation_data": slice(n_train, n_train_validate),
+            "train_validate_data": slice(0, n_train_validate),
+            "test_data": slice(n_train_validate, n_full),
+            "full_data": slice(0, n_full),
+        }
+
+        return cls(rating_matrix.take(order), bounds)
+
+    def rows(self, split_name: str) -> slice:
+        return self.__bounds[split_name]
+
+    def size(self, split_name: str) -> int:
+        rows = self.__bounds[split_name]
+        return rows.stop - rows.start
+
+    def arrays(self, split_name: str) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows = self.__bounds[split_name]
+        return (
+            self.rating_matrix.user_codes[rows],
+            self.rating_matrix.item_codes[rows],
+            self.rating_matrix.ratings[rows],
+        )
+
+    def share(self) -> tuple[SharedArrays, dict]:
+        # Copies the table once into shared memory. The returned state is
+        # picklable; attach() rebuilds the splits from it in another process
+        # without copying. Object id arrays are stored as fixed-width strings.
+        rating_matrix = self.rating_matrix
+
+        def shareable(values: np.ndarray) -> np.ndarray:
+            return values.astype(str) if values.dtype == object else values
+
+        shared = SharedArrays(
+            {
+                "user_codes": rating_matrix.user_codes,
+                "item_codes": rating_matrix.item_codes,
+                "ratings": rating_matrix.ratings,
+                "user_ids": shareable(rating_matrix.user_ids),
+                "isbns": shareable(rating_matrix.isbns),
+            }
+        )
+
+        return shared, {"descriptor": shared.descriptor, "bounds": self.__bounds}
+
+    @classmethod
+    def attach(cls, state: dict) -> "DataSplits":
+        arrays, blocks = SharedArrays.attach(state["descriptor"])
+        data_splits = cls(RatingMatrix(**arrays), state["bounds"])
+        # The blocks must outlive the views the rating matrix holds.
+        data_splits.__shared_blocks = blocks
+
+        return data_splits
@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from loguru import logger
+from pandas import DataFrame
+
+from configurations.config import DATASET_CACHE_DIR
+
+# Bump when the cleaning pipeline changes so that old entries stop matching.
+CACHE_FORMAT_VERSION = 3
+
+
+class DatasetCache:
+
+    def __init__(self, cache_dir: str | None = DATASET_CACHE_DIR) -> None:
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.getcwd()), "dataset_cache")
+        self.cache_dir = cache_dir
+        self.__fingerprints_path = os.path.join(cache_dir, "fingerprints.json")
+
+    def __read_known_fingerprints(self) -> dict:
+        if not os.path.exists(self.__fingerprints_path):
+            return {}
+        with open(self.__fingerprints_path, "r") as file:
+            return json.load(file)
+
+    def __write_known_fingerprints(self, fingerprints: dict) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.__fingerprints_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(fingerprints, file)
+        os.replace(tmp_path, self.__fingerprints_path)
+
+    @staticmethod
+    def __hash_file(filepath: str) -> str:
+        digest = hashlib.sha256()
+        with open(filepath, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def file_fingerprint(self, filepath: str, known: dict | None = None) -> dict:
+        # The content hash is only recomputed when size or mtime have changed.
+        stat = os.stat(filepath)
+        path = os.path.abspath(filepath)
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+        previous = (known or {}).get(path)
+        if previous and all(previous[k] == fingerprint[k] for k in fingerprint):
+            fingerprint["sha256"] = previous["sha256"]
+        else:
+            fingerprint["sha256"] = self.__hash_file(filepath)
+
+        return fingerprint
+
+    def files_fingerprint(self, filepaths: list[str]) -> list[str]:
+        # Content hashes of the files, ordered by absolute path.
+        known = self.__read_known_fingerprints()
+        fingerprints = {
+            os.path.abspath(filepath): self.file_fingerprint(filepath, known)
+            for filepath in filepaths
+        }
+        if any(known.get(path) != value for path, value in fingerprints.items()):
+            known.update(fingerprints)
+            self.__write_known_fingerprints(known)
+
+        return [fingerprints[path]["sha256"] for path in sorted(fingerprints)]
+
+    def make_key(self, filepaths: list[str], cleaning_config: dict) -> str:
+        payload = json.dumps(
+            {
+                "version": CACHE_FORMAT_VERSION,
+                "files": self.files_fingerprint(filepaths),
+                "cleaning_config": cleaning_config,
+            },
+            sort_keys=True,
+        )
+
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def __get_filepath(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def load(self, key: str) -> DataFrame | None:
+        filepath = self.__get_filepath(key)
+        if not os.path.exists(filepath):
+            logger.debug("Dataset cache miss.")
+            return None
+
+        with np.load(filepath, allow_pickle=False) as columns:
+            column_names = [str(name) for name in columns["__columns__"]]
+            data = DataFrame({name: columns[name] for name in column_names})
+
+        logger.debug(f"Dataset cache hit: {len(data)} rows.")
+
+        return data
+
+    def save(self, key: str, data: DataFrame) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        columns = {"__columns__": np.asarray(data.columns, dtype=str)}
+        for name in data.columns:
+            values = data[name].to_numpy()
+            if values.dtype == object:
+                values = values.astype(str)
+            columns[name] = values
+
+        filepath = self.__get_filepath(key)
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "wb") as file:
+            np.savez(file, **columns)
+        os.replace(tmp_path, filepath)
+
+        # Only the latest cleaned dataset is kept, as with saved models.
+        for file_name in os.listdir(self.cache_dir):
+            file_path = os.path.join(self.cache_dir, file_name)
+            if file_name.endswith(".npz") and file_path != filepath:
+                os.remove(file_path)
+
+        logger.debug("The cleaned dataset was cached.")
@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class Evaluator:
+    # Vectorized rating metrics over aligned (user_code, est, true) arrays.
+
+    @staticmethod
+    def rmse(est: np.ndarray, true: np.ndarray) -> float:
+        errors = np.asarray(est, dtype=np.float64) - np.asarray(true, dtype=np.float64)
+        return float(np.sqrt(np.mean(errors**2)))
+
+    @staticmethod
+    def precision_recall_at_k(
+        user_codes: np.ndarray,
+        est: np.ndarray,
+        true: np.ndarray,
+        k: int = 10,
+        threshold: float = 0.7,
+    ) -> tuple[float, float]:
+        # Same definitions as the surprise FAQ recipe: per user, rank by est,
+        # precision = relevant & recommended in top k / recommended in top k and
+        # recall = relevant & recommended in top k / relevant, with 0 for
+        # undefined ratios, then averaged over users.
+        user_codes = np.asarray(user_codes)
+        est = np.asarray(est, dtype=np.float64)
+        true = np.asarray(true, dtype=np.float64)
+        if len(user_codes) == 0:
+            return 0.0, 0.0
+
+        # Stable sort by user, then by descending estimate.
+        order = np.lexsort((-est, user_codes))
+        sorted_users = user_codes[order]
+        group_starts = np.flatnonzero(
+            np.r_[True, sorted_users[1:] != sorted_users[:-1]]
+        )
+        group_sizes = np.diff(np.r_[group_starts, len(order)])
+        rank_in_group = np.arange(len(order)) - np.repeat(group_starts, group_sizes)
+        in_top_k = rank_in_group < k
+
+        relevant = true[order] >= threshold
+        recommended = est[order] >= threshold
+
+        group_ids = np.repeat(np.arange(len(group_starts)), group_sizes)
+        n_groups = len(group_starts)
+        n_rel = np.bincount(group_ids, weights=relevant, minlength=n_groups)
+        n_rec_k = np.bincount(
+            group_ids, weights=recommended & in_top_k, minlength=n_groups
+        )
+        n_rel_and_rec_k = np.bincount(
+            group_ids, weights=relevant & recommended & in_top_k, minlength=n_groups
+        )
+
+        precisions = np.divide(
+            n_rel_and_rec_k, n_rec_k, out=np.zeros(n_groups), where=n_rec_k != 0
+        )
+        recalls = np.divide(
+            n_rel_and_rec_k, n_rel, out=np.zeros(n_groups), where=n_rel != 0
+        )
+
+        return float(precisions.mean()), float(recalls.mean())
+
+    @classmethod
+    def get_metrics(
+        cls, user_codes: np.ndarray, est: np.ndarray, true: np.ndarray
+    ) -> dict:
+        precisions, recalls = cls.precision_recall_at_k(user_codes, est, true)
+
+        return {
+            "Precision@k": precisions,
+            "Recall@K": recalls,
+            "RMSE": cls.rmse(est, true),
+        }
@@ -1,8 +1,16 @@
+import json
 import os
 import pickle
+import shutil
 import uuid
 
 from loguru import logger
+from scipy.sparse import csr_matrix, load_npz, save_npz
+from surprise.prediction_algorithms.algo_base import AlgoBase
+
+from configurations.config import ANN_MIN_ITEMS, ANN_N_LISTS, ANN_N_PROBE
+from worker.operations.ml_models.FactorModel import FactorModel
+from worker.operations.ml_models.IVFIndex import IVFIndex
 
 
 class ModelSaver:
@@ -42,27 +50,166 @@ class ModelSaver:
         if not os.path.exists(folder_path):
             os.makedirs(folder_path)
 
+        self.__clear_folder(folder_path)
+        with open(filepath, "wb") as file:
+            file.write(bytes_model)
+
+        logger.debug("The model was saved locally.")
+
+    @staticmethod
+    def __clear_folder(folder_path: str) -> None:
         # Clear the contents of the folder
         for file_name in os.listdir(folder_path):
             file_path = os.path.join(folder_path, file_name)
             try:
                 if os.path.isfile(file_path):
                     os.remove(file_path)
+                elif os.path.isdir(file_path):
+                    shutil.rmtree(file_path)
             except FileNotFoundError as e:
                 logger.debug(
                     f"FileServiceProvider __save_locally_model_cache(): "
                     f"Failed to delete the model {file_path}. Error: {e}"
                 )
-        with open(filepath, "wb") as file:
-            file.write(bytes_model)
 
-        logger.debug("The model was saved locally.")
+    @staticmethod
+    def __model_dir(model_uuid: uuid.UUID) -> str:
+        path_0 = os.path.dirname(os.getcwd())
+        path_1 = "saved_models"
+
+        return os.path.join(path_0, path_1, str(model_uuid))
+
+    def __save_locally_arrays(self, model: FactorModel, model_uuid: uuid.UUID) -> None:
+        directory = self.__model_dir(model_uuid)
+        folder_path = os.path.dirname(directory)
+        os.makedirs(folder_path, exist_ok=True)
+        self.__clear_folder(folder_path)
 
-    def save_model(self, model, model_uuid: uuid.UUID) -> None:
-        bytes_model = self.__serialize_model(model)
-        self.__save_locally_model(bytes_model, model_uuid)
+        # Written aside and renamed, so a reader never sees half an artifact.
+        tmp_directory = directory + ".tmp"
+        model.save(tmp_directory)
+        os.replace(tmp_directory, directory)
+
+        logger.debug("The model arrays were saved locally.")
+
+    @staticmethod
+    def __to_array_model(model) -> FactorModel | None:
+        # Factor models are stored as plain arrays; everything else is pickled.
+        if isinstance(model, FactorModel):
+            return model
+        if isinstance(model, AlgoBase) and getattr(model, "biased", False):
+            return FactorModel.from_surprise(model)
+        return None
+
+    @staticmethod
+    def __metadata_path(model_uuid: uuid.UUID) -> str:
+        path_0 = os.path.dirname(os.getcwd())
+        path_1 = "saved_models"
+        file_name = str(model_uuid) + ".json"
+
+        return os.path.join(path_0, path_1, file_name)
+
+    @staticmethod
+    def __seen_items_path(model_uuid: uuid.UUID) -> str:
+        path_0 = os.path.dirname(os.getcwd())
+        path_1 = "saved_models"
+        file_name = str(model_uuid) + ".seen.npz"
+
+        return os.path.join(path_0, path_1, file_name)
+
+    @staticmethod
+    def __ann_index_path(model_uuid: uuid.UUID) -> str:
+        path_0 = os.path.dirname(os.getcwd())
+        path_1 = "saved_models"
+        file_name = str(model_uuid) + ".ann.npz"
+
+        return os.path.join(path_0, path_1, file_name)
+
+    @staticmethod
+    def __build_ann_index(model: FactorModel | None) -> IVFIndex | None:
+        # Only factor models rank books by an inner product, and small
+        # catalogues are cheaper to score exhaustively.
+        if model is None or model.n_items < ANN_MIN_ITEMS:
+            return None
+
+        return IVFIndex.build(
+            model.item_factors,
+            model.item_bias,
+            model.known_items,
+            n_lists=ANN_N_LISTS or None,
+            n_probe=ANN_N_PROBE,
+            random_state=0,
+        )
+
+    def save_model(
+        self,
+        model,
+        model_uuid: uuid.UUID,
+        metadata: dict | None = None,
+        seen_items: csr_matrix | None = None,
+    ) -> None:
+        array_model = self.__to_array_model(model)
+        if array_model is not None:
+            self.__save_locally_arrays(array_model, model_uuid)
+        else:
+            bytes_model = self.__serialize_model(model)
+            self.__save_locally_model(bytes_model, model_uuid)
+
+        # Users x books matrix of the training ratings; serving uses it to
+        # leave out books a user has already rated.
+        if seen_items is not None:
+            save_npz(self.__seen_items_path(model_uuid), seen_items.tocsr())
+
+        ann_index = self.__build_ann_index(array_model)
+        if ann_index is not None:
+            ann_index.save(self.__ann_index_path(model_uuid))
+            logger.debug("The ANN index was saved locally.")
+
+        # Training metadata (params, config fingerprint, data statistics) sits
+        # next to the model so a later run can decide whether to warm-start.
+        if metadata is not None:
+            with open(self.__metadata_path(model_uuid), "w") as file:
+                json.dump(metadata, file, default=str)
+
+    def get_seen_items(self, model_uuid: uuid.UUID) -> csr_matrix | None:
+        filepath = self.__seen_items_path(model_uuid)
+
+        if os.path.exists(filepath):
+            return load_npz(filepath).tocsr()
+        return None
+
+    def get_ann_index(self, model_uuid: uuid.UUID) -> IVFIndex | None:
+        filepath = self.__ann_index_path(model_uuid)
+
+        if os.path.exists(filepath):
+            return IVFIndex.load(filepath)
+        return None
+
+    def get_metadata(self, model_uuid: uuid.UUID) -> dict | None:
+        filepath = self.__metadata_path(model_uuid)
+
+        if os.path.exists(filepath):
+            with open(filepath) as file:
+                return json.load(file)
+        return None
+
+    def has_model(self, model_uuid: uuid.UUID) -> bool:
+        path_0 = os.path.dirname(os.getcwd())
+        path_1 = "saved_models"
+        file_name = str(model_uuid) + ".pkl"
+        manifest_path = os.path.join(self.__model_dir(model_uuid), "manifest.json")
+
+        return os.path.exists(os.path.join(path_0, path_1, file_name)) or (
+            os.path.exists(manifest_path)
+        )
 
     def get_model(self, model_uuid: uuid.UUID):
+        directory = self.__model_dir(model_uuid)
+        if os.path.exists(os.path.join(directory, "manifest.json")):
+            model = FactorModel.load(directory)
+            logger.debug("The model arrays were mapped.")
+            return model
+
         byte_model = self.__get_local_model(model_uuid)
 
         if byte_model:
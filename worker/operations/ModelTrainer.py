@@ -1,57 +1,174 @@
 import uuid
 
+import numpy as np
 from loguru import logger
-
+from pandas import Index
+from scipy.sparse import csr_matrix
+from surprise.prediction_algorithms.algo_base import AlgoBase
+
+from helpers.exceptions import ModelSelectionError
+from worker.operations.CandidateRunner import CandidateRunner
+from worker.operations.DataSplits import DataSplits
+from worker.operations.ml_models.FactorModel import FactorModel
+from worker.operations.ml_models.I_Model import I_Model
+from worker.operations.ml_models.ItemKNN import ItemKNNModel
+from worker.operations.ml_models.ItemKNNIndex import ItemKNNIndex
+from worker.operations.ml_models.NeuralMF import NeuralMF
 from worker.operations.ml_models.NeuralNet import NeuralNet
+from worker.operations.ml_models.NumpyMF import NumpyMFModel
 from worker.operations.ml_models.SVD import SurpriseSVDModel
 from worker.operations.ModelSaver import ModelSaver
+from worker.operations.RatingMatrix import RatingMatrix
+from worker.operations.WarmStartTrainer import WarmStartTrainer
 
 
 class ModelTrainer:
+    candidate_classes = (NeuralNet, SurpriseSVDModel, NumpyMFModel, ItemKNNModel)
 
     def __init__(self, task_type_id: int) -> None:
         # There may be logic here for implementations of
         # different preprocesing pipelines depending on the type of task.
         self.task_type_id = task_type_id
-        self.__svd = SurpriseSVDModel()
-        self.__neural_net = NeuralNet()
+        self.__candidates = [model_class() for model_class in self.candidate_classes]
         self.__model_saver = ModelSaver()
-
-    def __model_selection(self, dataframes: dict, configuration_dict: dict) -> dict:
-        svd_result = self.__svd.fit_and_validate(dataframes, configuration_dict)
-        net_result = self.__neural_net.fit_and_validate(dataframes)
-        results = [net_result, svd_result]
+        self.__warm_start_trainer = WarmStartTrainer()
+
+    def __concurrent_selection(
+        self,
+        data_splits: DataSplits,
+        configuration_dict: dict,
+        n_jobs: int,
+        time_budget: float | None,
+    ) -> list[dict]:
+        runner = CandidateRunner(n_jobs=n_jobs, time_budget=time_budget)
+        return runner.run(self.candidate_classes, data_splits, configuration_dict)
+
+    def __model_selection(
+        self, data_splits: DataSplits, configuration_dict: dict
+    ) -> dict:
+        runtime_parameters = configuration_dict["Model_runtime_parameters"]
+        n_jobs = runtime_parameters.get("Selection_Jobs", 1)
+        time_budget = runtime_parameters.get("Candidate_Time_Budget")
+
+        if n_jobs <= 1 and time_budget is None:
+            results = [
+                candidate.fit_and_validate(data_splits, configuration_dict)
+                for candidate in self.__candidates
+            ]
+        else:
+            results = self.__concurrent_selection(
+                data_splits, configuration_dict, n_jobs, time_budget
+            )
+
+        if not results:
+            raise ModelSelectionError()
         selected_model = min(results, key=lambda x: x["metrics"]["RMSE"])
 
+        # The winner was validated in a worker process: rebuild its state here
+        # for the final fit.
+        if "model_class" in selected_model:
+            model: I_Model = selected_model.pop("model_class")()
+            model.prepare_final_fit(data_splits, configuration_dict)
+            selected_model["model_name"] = model
+
         logger.debug("Done")
 
         return selected_model
 
-    def __save_best_model(self, model: NeuralNet | SurpriseSVDModel) -> uuid.UUID:
+    @staticmethod
+    def __seen_items(model, rating_matrix: RatingMatrix) -> csr_matrix:
+        # Every training interaction in the model's own code space, which may
+        # differ from the rating matrix codes.
+        if isinstance(model, AlgoBase):
+            model = FactorModel.from_surprise(model)
+
+        ratings = rating_matrix.to_coo()
+        user_codes = Index(model.user_ids).get_indexer(rating_matrix.user_ids)
+        item_codes = Index(model.isbns).get_indexer(rating_matrix.isbns)
+        users, items = user_codes[ratings.row], item_codes[ratings.col]
+        known = (users >= 0) & (items >= 0)
+
+        return csr_matrix(
+            (np.ones(known.sum(), dtype=np.float32), (users[known], items[known])),
+            shape=(len(model.user_ids), len(model.isbns)),
+        )
+
+    def __save_best_model(
+        self,
+        model: AlgoBase | FactorModel | ItemKNNIndex | NeuralMF,
+        metadata: dict | None = None,
+        seen_items: csr_matrix | None = None,
+    ) -> uuid.UUID:
         model_uuid = uuid.uuid4()
-        self.__model_saver.save_model(model, model_uuid)
+        self.__model_saver.save_model(model, model_uuid, metadata, seen_items)
 
         logger.debug("Done")
 
         return model_uuid
 
-    def run(self, dataframes: dict, configuration_dict: dict) -> dict:
-        selected_model = self.__model_selection(dataframes, configuration_dict)
-        model: NeuralNet | SurpriseSVDModel = selected_model["model_name"]
+    def __warm_start(
+        self,
+        data_splits: DataSplits,
+        configuration_dict: dict,
+        previous_model_uuid: uuid.UUID | None,
+    ) -> dict | None:
+        runtime_parameters = configuration_dict["Model_runtime_parameters"]
+        if not runtime_parameters.get("Warm_Start", False) or not previous_model_uuid:
+            return None
+
+        result = self.__warm_start_trainer.run(
+            previous_model=self.__model_saver.get_model(previous_model_uuid),
+            metadata=self.__model_saver.get_metadata(previous_model_uuid),
+            data_splits=data_splits,
+            configuration_dict=configuration_dict,
+        )
+
+        logger.debug("Done")
+
+        return result
+
+    def __full_train(self, data_splits: DataSplits, configuration_dict: dict) -> dict:
+        selected_model = self.__model_selection(data_splits, configuration_dict)
+        model: I_Model = selected_model["model_name"]
         params: dict = selected_model["params"]
         metrics: dict = selected_model["metrics"]
 
         result = model.fit_final_model(params)
-        model: NeuralNet | SurpriseSVDModel = result["model"]
+        model: AlgoBase | FactorModel | ItemKNNIndex | NeuralMF = result["model"]
         metrics: dict = result["metrics"]
 
-        model_uuid = self.__save_best_model(model)
-
         logger.debug("Done")
 
         return {
-            "model_uuid": model_uuid,
+            "model": model,
             "params": params,
             "metrics": metrics,
+            "metadata": WarmStartTrainer.build_metadata(
+                data_splits, configuration_dict, params, metrics
+            ),
+        }
+
+    def run(
+        self,
+        data_splits: DataSplits,
+        configuration_dict: dict,
+        previous_model_uuid: uuid.UUID | None = None,
+    ) -> dict:
+        result = self.__warm_start(data_splits, configuration_dict, previous_model_uuid)
+        if result is None:
+            result = self.__full_train(data_splits, configuration_dict)
+
+        model_uuid = self.__save_best_model(
+            result["model"],
+            result["metadata"],
+            self.__seen_items(result["model"], data_splits.rating_matrix),
+        )
+
+        logger.debug("Done")
+
+        return {
+            "model_uuid": model_uuid,
+            "params": result["params"],
+            "metrics": result["metrics"],
             "model_type_id": self.task_type_id,
         }
@@ -1,14 +1,22 @@
+import time
+
 import numpy as np
 from loguru import logger
-from pandas import DataFrame, concat, read_csv, to_numeric
+from pandas import Categorical, DataFrame, Index, factorize, read_csv, to_numeric
 
 from configurations.config import (
     BOOKS_DF,
+    RATINGS_CHUNK_SIZE,
     RATINGS_DF,
+    SPLIT_SEED,
     TEST_SIZE,
     USERS_DF,
     VALIDATION_SIZE,
 )
+from helpers.group_sampling import sample_per_group
+from worker.operations.DatasetCache import DatasetCache
+from worker.operations.DataSplits import DataSplits
+from worker.operations.RatingMatrix import RatingMatrix
 
 
 class Preprocesor:
@@ -16,19 +24,83 @@ class Preprocesor:
         # There may be logic here for implementations of
         # different preprocesing pipelines depending on the type of task.
         self.task_type = task_type
+        self._dataset_cache = DatasetCache()
 
     @staticmethod
-    def __read_data() -> tuple[DataFrame, DataFrame, DataFrame]:
-        books_df = read_csv(BOOKS_DF, dtype={3: "str"})
-        ratings_df = read_csv(RATINGS_DF)
+    def __read_data() -> tuple[DataFrame, DataFrame]:
+        # All-numeric ISBNs would otherwise parse as numbers and lose their
+        # leading zeros.
+        books_df = read_csv(
+            BOOKS_DF, dtype={"ISBN": "str", "Year-Of-Publication": "str"}
+        )
         users_df = read_csv(USERS_DF)
 
-        return books_df, ratings_df, users_df
+        return books_df, users_df
+
+    @staticmethod
+    def __read_ratings() -> DataFrame:
+        ratings_df = read_csv(RATINGS_DF, dtype={"ISBN": "str"})
+        ratings_df.rename(
+            columns={
+                "ISBN": "isbn",
+                "User-ID": "user_id",
+                "Book-Rating": "rating",
+            },
+            inplace=True,
+        )
+
+        return ratings_df
+
+    @staticmethod
+    def __stream_ratings(
+        books_df: DataFrame, users_df: DataFrame, chunk_size: int
+    ) -> DataFrame:
+        # Reads RATINGS_DF in bounded chunks with compact dtypes and keeps only
+        # rows of known users and books, so the raw file never sits in memory.
+        # Missing or malformed user ids are coerced to NaN and dropped with the
+        # unknown users.
+        isbn_index = Index(books_df["isbn"].astype(str).unique())
+        user_index = Index(users_df["user_id"].unique())
+        user_chunks, item_chunks, rating_chunks = [], [], []
+        n_read = 0
+
+        chunks = read_csv(
+            RATINGS_DF,
+            usecols=["User-ID", "ISBN", "Book-Rating"],
+            dtype={"User-ID": "str", "ISBN": "str", "Book-Rating": np.int8},
+            chunksize=chunk_size,
+        )
+        for chunk in chunks:
+            n_read += len(chunk)
+            user_ids = to_numeric(chunk["User-ID"], errors="coerce").to_numpy()
+            item_codes = isbn_index.get_indexer(chunk["ISBN"]).astype(np.int32)
+            known = (item_codes >= 0) & (user_index.get_indexer(user_ids) >= 0)
+
+            user_chunks.append(user_ids[known].astype(np.int32))
+            item_chunks.append(item_codes[known])
+            rating_chunks.append(chunk["Book-Rating"].to_numpy()[known])
+
+        ratings_df = DataFrame(
+            {
+                "user_id": np.concatenate(user_chunks),
+                "isbn": Categorical.from_codes(
+                    np.concatenate(item_chunks), categories=isbn_index
+                ),
+                "rating": np.concatenate(rating_chunks),
+            }
+        )
+
+        logger.info(
+            f"Streamed {n_read} ratings, kept {len(ratings_df)} of known users "
+            f"and books ({round(ratings_df.memory_usage(deep=False).sum() / 2**20, 1)} MiB)."
+        )
+
+        return ratings_df
 
     @staticmethod
     def __rename_columns(
-        books_df: DataFrame, ratings_df: DataFrame, users_df: DataFrame
-    ) -> tuple[DataFrame, DataFrame, DataFrame]:
+        books_df: DataFrame, users_df: DataFrame
+    ) -> tuple[DataFrame, DataFrame]:
 
         books_df.rename(
             columns={
@@ -40,20 +112,12 @@ class Preprocesor:
             },
             inplace=True,
         )
-        ratings_df.rename(
-            columns={
-                "ISBN": "isbn",
-                "User-ID": "user_id",
-                "Book-Rating": "rating",
-            },
-            inplace=True,
-        )
         users_df.rename(
             columns={"User-ID": "user_id"},
             inplace=True,
         )
 
-        return books_df, ratings_df, users_df
+        return books_df, users_df
 
     @staticmethod
     def __year_to_num(books_df: DataFrame) -> DataFrame:
@@ -91,134 +155,168 @@ class Preprocesor:
             ["book_title", "book_author", "year", "publisher"], axis=1, inplace=True
         )
 
-        return ratings_df
+        return ratings_users
 
     @staticmethod
-    def __drop_zero_rating(data: DataFrame, groupby_column: str) -> DataFrame:
-        grouped_sum_ratings = data.groupby([groupby_column]).sum()["rating"]
-        zero_ratings = grouped_sum_ratings[grouped_sum_ratings == 0]
-        data = data[~data[groupby_column].isin(zero_ratings.index)]
+    def __core_members(
+        codes: np.ndarray, ratings: np.ndarray, n_codes: int, min_ratings: int
+    ) -> np.ndarray:
+        # A user/book stays if it has a non-zero rating sum and enough ratings.
+        counts = np.bincount(codes, minlength=n_codes)
+        sums = np.bincount(codes, weights=ratings, minlength=n_codes)
+
+        return (sums != 0) & (counts >= min_ratings)
+
+    def __k_core(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        min_user_ratings: int,
+        min_book_ratings: int,
+    ) -> np.ndarray:
+        # Dropping books can push users back under the limit (and vice versa),
+        # so both filters are repeated until neither removes anything.
+        start = time.time()
+        n_users = int(user_codes.max()) + 1 if len(user_codes) else 0
+        n_items = int(item_codes.max()) + 1 if len(item_codes) else 0
+        rows = np.arange(len(ratings))
+        iterations = 0
+
+        while True:
+            iterations += 1
+            n_rows = len(rows)
+
+            users_kept = self.__core_members(
+                user_codes[rows], ratings[rows], n_users, min_user_ratings
+            )
+            rows = rows[users_kept[user_codes[rows]]]
 
-        return data
+            items_kept = self.__core_members(
+                item_codes[rows], ratings[rows], n_items, min_book_ratings
+            )
+            rows = rows[items_kept[item_codes[rows]]]
 
-    @staticmethod
-    def __more_than_ratings(
-        data: DataFrame, groupby_column: str, min_ratings: int
-    ) -> DataFrame:
-        grouped_count_ratings = data.groupby([groupby_column]).count()["rating"]
-        more_than = grouped_count_ratings[grouped_count_ratings >= min_ratings]
-        data = data[data[groupby_column].isin(more_than.index)]
+            logger.debug(
+                f"k-core iteration {iterations}: {n_rows} -> {len(rows)} ratings "
+                f"({round(time.time() - start, 3)} sec. elapsed)."
+            )
+            if len(rows) == n_rows:
+                break
+
+        logger.info(
+            f"k-core filtering kept {len(rows)} of {len(ratings)} ratings "
+            f"after {iterations} iterations within {round(time.time() - start, 3)} sec."
+        )
 
-        return data
+        return rows
 
     def __clean_up_data(
-        self, data: DataFrame, groupby_column: str, min_ratings: int
+        self, data: DataFrame, min_user_ratings: int, min_book_ratings: int
     ) -> DataFrame:
-        data = self.__drop_zero_rating(data, groupby_column)
-        data = self.__more_than_ratings(data, groupby_column, min_ratings)
+        # factorize() codes missing ids as -1; like the groupby passes before,
+        # rows without a user or book id are dropped.
+        data = data.dropna(subset=["user_id", "isbn"])
+        user_codes, _ = factorize(data["user_id"])
+        item_codes, _ = factorize(data["isbn"])
+        rows = self.__k_core(
+            user_codes=user_codes,
+            item_codes=item_codes,
+            ratings=data["rating"].to_numpy(dtype=np.float64),
+            min_user_ratings=min_user_ratings,
+            min_book_ratings=min_book_ratings,
+        )
 
-        return data
+        return data.iloc[rows]
 
     @staticmethod
-    def __train_test(
-        data: DataFrame,
-    ) -> tuple[DataFrame, DataFrame]:
-        train_data = DataFrame(columns=data.columns)
-        test_data = DataFrame(columns=data.columns)
-
-        for _, user_data in data.groupby("user_id"):
-            rated_data = user_data[user_data["rating"] > 0]
-            test_count = int(len(rated_data) * TEST_SIZE)
-
-            test_indices = np.random.choice(
-                rated_data.index, size=test_count, replace=False
-            )
-            user_test_data = user_data.loc[test_indices]
-            user_train_data = user_data.drop(test_indices)
-
-            test_data = concat([test_data, user_test_data])
-            train_data = concat([train_data, user_train_data])
-
-        train_data = train_data.reset_index(drop=True)
-        test_data = test_data.reset_index(drop=True)
+    def __train_test(rating_matrix: RatingMatrix) -> tuple[np.ndarray, np.ndarray]:
+        is_test = sample_per_group(
+            group_codes=rating_matrix.user_codes,
+            eligible=rating_matrix.ratings > 0,
+            fraction=TEST_SIZE,
+            seed=SPLIT_SEED,
+        )
 
-        return train_data, test_data
+        return np.flatnonzero(~is_test), np.flatnonzero(is_test)
 
     @staticmethod
-    def __validation_data(test_data: DataFrame) -> tuple[DataFrame, DataFrame]:
-        data_shuffled = test_data.sample(frac=1, random_state=42).reset_index(drop=True)
-        val_set_size = int(len(test_data) * VALIDATION_SIZE)
-
-        validation_data = data_shuffled[:val_set_size]
-        test_data = data_shuffled[val_set_size:]
-
-        return validation_data, test_data
+    def __validation_data(test_rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng(SPLIT_SEED)
+        rows_shuffled = rng.permutation(test_rows)
+        val_set_size = int(len(test_rows) * VALIDATION_SIZE)
 
-    @staticmethod
-    def __normalization(
-        train_data: DataFrame,
-        test_data: DataFrame,
-        validation_data: DataFrame,
-    ) -> tuple[DataFrame, DataFrame, DataFrame]:
-        train_data["rating"] = (train_data["rating"] - np.min(train_data["rating"])) / (
-            np.max(train_data["rating"]) - np.min(train_data["rating"])
-        )
-        test_data["rating"] = (test_data["rating"] - np.min(train_data["rating"])) / (
-            np.max(train_data["rating"]) - np.min(train_data["rating"])
-        )
-        validation_data["rating"] = (
-            validation_data["rating"] - np.min(train_data["rating"])
-        ) / (np.max(train_data["rating"]) - np.min(train_data["rating"]))
+        validation_rows = rows_shuffled[:val_set_size]
+        test_rows = rows_shuffled[val_set_size:]
 
-        return train_data, test_data, validation_data
+        return validation_rows, test_rows
 
     @staticmethod
-    def __concatenate(train_data: DataFrame, validation_data: DataFrame) -> DataFrame:
-        result_df = concat([train_data, validation_data], ignore_index=True)
-        return result_df
-
-    def run(self, configuration_dict: dict) -> dict:
-        books_df, ratings_df, users_df = self.__read_data()
-        books_df, ratings_df, users_df = self.__rename_columns(
-            books_df, ratings_df, users_df
-        )
+    def __normalization(data_splits: DataSplits) -> None:
+        # Min-max scaling fitted on the train split, applied in place to the
+        # shared ratings so every split sees the same scale.
+        _, _, train_ratings = data_splits.arrays("train_data")
+        min_rating = train_ratings.min()
+        max_rating = train_ratings.max()
+
+        ratings = data_splits.rating_matrix.ratings
+        ratings -= min_rating
+        ratings /= max_rating - min_rating
+
+    def __build_clean_data(
+        self, min_user_rating: int, min_book_rating: int
+    ) -> DataFrame:
+        books_df, users_df = self.__read_data()
+        books_df, users_df = self.__rename_columns(books_df, users_df)
         books_df = self.__year_to_num(books_df)
         books_df, users_df = self.__drop_columns(books_df, users_df)
-        full_data = self.__merge_df(books_df, ratings_df, users_df)
-        full_data = self.__clean_up_data(
-            data=full_data,
-            groupby_column="user_id",
-            min_ratings=int(
-                configuration_dict["Model_runtime_parameters"]["Min_User_Rating"]
-            ),
-        )
+
+        if RATINGS_CHUNK_SIZE > 0:
+            full_data = self.__stream_ratings(books_df, users_df, RATINGS_CHUNK_SIZE)
+        else:
+            ratings_df = self.__read_ratings()
+            full_data = self.__merge_df(books_df, ratings_df, users_df)
         full_data = self.__clean_up_data(
             data=full_data,
-            groupby_column="isbn",
-            min_ratings=int(
-                configuration_dict["Model_runtime_parameters"]["Min_Book_Rating"]
-            ),
+            min_user_ratings=min_user_rating,
+            min_book_ratings=min_book_rating,
         )
 
-        train_data, test_data = self.__train_test(full_data)
-        validation_data, test_data = self.__validation_data(test_data)
-        train_data, test_data, validation_data = self.__normalization(
-            train_data, test_data, validation_data
+        return full_data
+
+    def __get_clean_data(self, configuration_dict: dict) -> DataFrame:
+        runtime_parameters = configuration_dict["Model_runtime_parameters"]
+        cleaning_config = {
+            "Min_User_Rating": int(runtime_parameters["Min_User_Rating"]),
+            "Min_Book_Rating": int(runtime_parameters["Min_Book_Rating"]),
+        }
+
+        cache_key = self._dataset_cache.make_key(
+            [BOOKS_DF, RATINGS_DF, USERS_DF], cleaning_config
         )
-        train_validate_data = self.__concatenate(train_data, validation_data)
+        full_data = self._dataset_cache.load(cache_key)
+
+        if full_data is None:
+            full_data = self.__build_clean_data(
+                min_user_rating=cleaning_config["Min_User_Rating"],
+                min_book_rating=cleaning_config["Min_Book_Rating"],
+            )
+            self._dataset_cache.save(cache_key, full_data)
 
-        train_data.drop(train_data.columns[0], axis=1, inplace=True)
-        validation_data.drop(validation_data.columns[0], axis=1, inplace=True)
-        train_validate_data.drop(train_validate_data.columns[0], axis=1, inplace=True)
-        test_data.drop(test_data.columns[0], axis=1, inplace=True)
-        full_data.drop(full_data.columns[0], axis=1, inplace=True)
+        return full_data
+
+    def run(self, configuration_dict: dict) -> DataSplits:
+        full_data = self.__get_clean_data(configuration_dict)
+        rating_matrix = RatingMatrix.from_dataframe(full_data)
+        del full_data
+
+        train_rows, test_rows = self.__train_test(rating_matrix)
+        validation_rows, test_rows = self.__validation_data(test_rows)
+        data_splits = DataSplits.from_rows(
+            rating_matrix, train_rows, validation_rows, test_rows
+        )
+        self.__normalization(data_splits)
 
         logger.info("Preprocesing is done.")
 
-        return {
-            "train_data": train_data,
-            "validation_data": validation_data,
-            "train_validate_data": train_validate_data,
-            "test_data": test_data,
-            "full_data": full_data,
-        }
+        return data_splits
@@ -0,0 +1,98 @@
+import numpy as np
+from pandas import DataFrame, Index, factorize
+from scipy.sparse import coo_matrix, csr_matrix
+
+
+class RatingMatrix:
+    # Ratings encoded once into contiguous int32 user/item codes. The raw ids
+    # are kept in code order, so user_ids[code] and isbns[code] decode them.
+
+    def __init__(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        user_ids: np.ndarray,
+        isbns: np.ndarray,
+    ) -> None:
+        self.user_codes = np.asarray(user_codes, dtype=np.int32)
+        self.item_codes = np.asarray(item_codes, dtype=np.int32)
+        self.ratings = np.asarray(ratings, dtype=np.float32)
+        self.user_ids = np.asarray(user_ids)
+        self.isbns = np.asarray(isbns)
+
+        self.__csr: csr_matrix | None = None
+        self.__user_index: Index | None = None
+        self.__item_index: Index | None = None
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        data: DataFrame,
+        user_column: str = "user_id",
+        item_column: str = "isbn",
+        rating_column: str = "rating",
+    ) -> "RatingMatrix":
+        user_codes, user_ids = factorize(data[user_column], sort=True)
+        item_codes, isbns = factorize(data[item_column], sort=True)
+
+        return cls(
+            user_codes=user_codes,
+            item_codes=item_codes,
+            ratings=data[rating_column].to_numpy(),
+            user_ids=np.asarray(user_ids),
+            isbns=np.asarray(isbns),
+        )
+
+    def take(self, rows: np.ndarray) -> "RatingMatrix":
+        # Same encoding, selected/reordered ratings.
+        return RatingMatrix(
+            user_codes=self.user_codes[rows],
+            item_codes=self.item_codes[rows],
+            ratings=self.ratings[rows],
+            user_ids=self.user_ids,
+            isbns=self.isbns,
+        )
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.isbns)
+
+    @property
+    def n_ratings(self) -> int:
+        return len(self.ratings)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.n_users, self.n_items
+
+    def to_coo(self, rows: np.ndarray | None = None) -> coo_matrix:
+        if rows is None:
+            rows = slice(None)
+
+        return coo_matrix(
+            (self.ratings[rows], (self.user_codes[rows], self.item_codes[rows])),
+            shape=self.shape,
+            dtype=np.float32,
+        )
+
+    def to_csr(self) -> csr_matrix:
+        # Built once and shared; implicit (zero) ratings stay as stored entries.
+        if self.__csr is None:
+            self.__csr = self.to_coo().tocsr()
+        return self.__csr
+
+    def encode_users(self, user_ids) -> np.ndarray:
+        # Unknown ids are encoded as -1.
+        if self.__user_index is None:
+            self.__user_index = Index(self.user_ids)
+        return self.__user_index.get_indexer(user_ids).astype(np.int32)
+
+    def encode_items(self, isbns) -> np.ndarray:
+        if self.__item_index is None:
+            self.__item_index = Index(self.isbns)
+        return self.__item_index.get_indexer(isbns).astype(np.int32)
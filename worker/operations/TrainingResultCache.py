@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import uuid
+
+from loguru import logger
+
+from configurations.config import (
+    BOOKS_DF,
+    RATINGS_DF,
+    SPLIT_SEED,
+    TEST_SIZE,
+    USERS_DF,
+    VALIDATION_SIZE,
+)
+from worker.operations.DatasetCache import DatasetCache
+from worker.operations.ModelSaver import ModelSaver
+
+# Bump when training changes in a way that should invalidate old results.
+CACHE_FORMAT_VERSION = 1
+
+
+class TrainingResultCache:
+    # Maps (dataset fingerprint, configuration JSON, model type) to the result
+    # of a finished training run: model uuid, params and metrics. An entry is
+    # only a hit while its model artifact still exists.
+
+    def __init__(
+        self,
+        dataset_cache: DatasetCache | None = None,
+        model_saver: ModelSaver | None = None,
+    ) -> None:
+        self._dataset_cache = dataset_cache or DatasetCache()
+        self._model_saver = model_saver or ModelSaver()
+        self.__results_path = os.path.join(
+            self._dataset_cache.cache_dir, "training_results.json"
+        )
+
+    def __read_results(self) -> dict:
+        if not os.path.exists(self.__results_path):
+            return {}
+        with open(self.__results_path, "r") as file:
+            return json.load(file)
+
+    def __write_results(self, results: dict) -> None:
+        os.makedirs(self._dataset_cache.cache_dir, exist_ok=True)
+        tmp_path = self.__results_path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(results, file, default=str)
+        os.replace(tmp_path, self.__results_path)
+
+    def make_key(self, configuration_dict: dict, model_type_id: int) -> str:
+        # The split settings come from the environment rather than the
+        # configuration row, but they change the result just as much.
+        payload = json.dumps(
+            {
+                "version": CACHE_FORMAT_VERSION,
+                "files": self._dataset_cache.files_fingerprint(
+                    [BOOKS_DF, RATINGS_DF, USERS_DF]
+                ),
+                "configuration": configuration_dict,
+                "splits": [TEST_SIZE, VALIDATION_SIZE, SPLIT_SEED],
+                "model_type_id": model_type_id,
+            },
+            sort_keys=True,
+            default=str,
+        )
+
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> dict | None:
+        entry = self.__read_results().get(key)
+        if entry is None:
+            logger.debug("Training cache miss.")
+            return None
+
+        model_uuid = uuid.UUID(entry["model_uuid"])
+        if not self._model_saver.has_model(model_uuid):
+            logger.debug(f"Training cache entry for model {model_uuid} is stale.")
+            return None
+
+        logger.info(f"Training cache hit: reusing model {model_uuid}.")
+
+        return {**entry, "model_uuid": model_uuid}
+
+    def save(self, key: str, train_result: dict) -> None:
+        results = {
+            cached_key: entry
+            for cached_key, entry in self.__read_results().items()
+            if self._model_saver.has_model(uuid.UUID(entry["model_uuid"]))
+        }
+        results[key] = {
+            "model_uuid": str(train_result["model_uuid"]),
+            "params": train_result["params"],
+            "metrics": train_result["metrics"],
+            "model_type_id": train_result["model_type_id"],
+        }
+        self.__write_results(results)
+
+        logger.debug("The training result was cached.")
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import time
+
+import numpy as np
+from loguru import logger
+from surprise.prediction_algorithms.algo_base import AlgoBase
+
+from configurations.config import (
+    SPLIT_SEED,
+    WARM_START_EPOCHS,
+    WARM_START_MAX_CYCLES,
+    WARM_START_MAX_MEAN_SHIFT,
+    WARM_START_MAX_NEW_FRACTION,
+)
+from worker.operations.DataSplits import DataSplits
+from worker.operations.Evaluator import Evaluator
+from worker.operations.ml_models.FactorModel import FactorModel
+from worker.operations.ml_models.SGDMatrixFactorization import SGDMatrixFactorization
+
+
+class WarmStartTrainer:
+    # Continues the previous model of a task type for a few SGD epochs over the
+    # current data instead of fitting from random initialization. New users and
+    # books get fresh rows; a full retrain is requested (run() returns None)
+    # when the configuration changed or the data drifted too far.
+    metric_prefix = "Warm_Start_"
+
+    def __init__(
+        self,
+        n_epochs: int = WARM_START_EPOCHS,
+        max_new_fraction: float = WARM_START_MAX_NEW_FRACTION,
+        max_mean_shift: float = WARM_START_MAX_MEAN_SHIFT,
+        max_cycles: int = WARM_START_MAX_CYCLES,
+    ) -> None:
+        self.n_epochs = n_epochs
+        self.max_new_fraction = max_new_fraction
+        self.max_mean_shift = max_mean_shift
+        self.max_cycles = max_cycles
+
+    @staticmethod
+    def config_fingerprint(configuration_dict: dict) -> str:
+        runtime_parameters = configuration_dict["Model_runtime_parameters"]
+        relevant_config = {
+            "Model_Hyperparameter_Config": configuration_dict[
+                "Model_Hyperparameter_Config"
+            ],
+            "Min_User_Rating": runtime_parameters["Min_User_Rating"],
+            "Min_Book_Rating": runtime_parameters["Min_Book_Rating"],
+        }
+        payload = json.dumps(relevant_config, sort_keys=True, default=str)
+
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def build_metadata(
+        data_splits: DataSplits,
+        configuration_dict: dict,
+        params: dict,
+        metrics: dict,
+        warm_cycles: int = 0,
+    ) -> dict:
+        _, _, ratings = data_splits.arrays("full_data")
+
+        return {
+            "config_fingerprint": WarmStartTrainer.config_fingerprint(
+                configuration_dict
+            ),
+            "params": params,
+            "metrics": metrics,
+            "global_mean": float(ratings.mean()),
+            "n_ratings": len(ratings),
+            "warm_cycles": warm_cycles,
+        }
+
+    @staticmethod
+    def __to_factor_model(previous_model) -> FactorModel | None:
+        if isinstance(previous_model, FactorModel):
+            return previous_model
+        if isinstance(previous_model, AlgoBase) and getattr(
+            previous_model, "biased", False
+        ):
+            return FactorModel.from_surprise(previous_model)
+        return None
+
+    def __full_retrain_reason(
+        self,
+        previous_model: FactorModel | None,
+        metadata: dict | None,
+        data_splits: DataSplits,
+        configuration_dict: dict,
+    ) -> str | None:
+        if previous_model is None or metadata is None:
+            return "no compatible previous model"
+        if metadata["config_fingerprint"] != self.config_fingerprint(
+            configuration_dict
+        ):
+            return "configuration changed"
+        if metadata["warm_cycles"] >= self.max_cycles:
+            return f"{metadata['warm_cycles']} warm-start cycles in a row"
+
+        rating_matrix = data_splits.rating_matrix
+        user_codes, item_codes, ratings = data_splits.arrays("full_data")
+        # Share of current ratings whose user or book the previous model never
+        # trained on.
+        user_rows = rating_matrix.encode_users(previous_model.user_ids)
+        item_rows = rating_matrix.encode_items(previous_model.isbns)
+        user_seen = np.zeros(rating_matrix.n_users, dtype=bool)
+        user_seen[user_rows[(user_rows >= 0) & previous_model.known_users]] = True
+        item_seen = np.zeros(rating_matrix.n_items, dtype=bool)
+        item_seen[item_rows[(item_rows >= 0) & previous_model.known_items]] = True
+
+        new_fraction = 1.0 - np.mean(user_seen[user_codes] & item_seen[item_codes])
+        if new_fraction > self.max_new_fraction:
+            return f"{round(100 * new_fraction, 1)}% of ratings involve new users/books"
+
+        mean_shift = abs(float(ratings.mean()) - metadata["global_mean"])
+        if mean_shift > self.max_mean_shift:
+            return f"global mean rating shifted by {round(mean_shift, 4)}"
+
+        return None
+
+    def __fit(
+        self,
+        initial_model: FactorModel,
+        params: dict,
+        data_splits: DataSplits,
+        split_name: str,
+    ) -> FactorModel:
+        rating_matrix = data_splits.rating_matrix
+        model = SGDMatrixFactorization(
+            n_factors=initial_model.n_factors,
+            n_epochs=self.n_epochs,
+            lr_all=params.get("lr_all", 0.005),
+            random_state=SPLIT_SEED,
+        )
+
+        return model.fit(
+            *data_splits.arrays(split_name),
+            user_ids=rating_matrix.user_ids,
+            isbns=rating_matrix.isbns,
+            rating_scale=initial_model.rating_scale,
+            init=initial_model,
+        )
+
+    def run(
+        self,
+        previous_model,
+        metadata: dict | None,
+        data_splits: DataSplits,
+        configuration_dict: dict,
+    ) -> dict | None:
+        start = time.time()
+        previous_model = self.__to_factor_model(previous_model)
+        reason = self.__full_retrain_reason(
+            previous_model, metadata, data_splits, configuration_dict
+        )
+        if reason is not None:
+            logger.info(f"Full retrain: {reason}.")
+            return None
+
+        rating_matrix = data_splits.rating_matrix
+        initial_model = previous_model.reindex(
+            rating_matrix.user_ids, rating_matrix.isbns, random_state=SPLIT_SEED
+        )
+        params = metadata["params"]
+
+        # The previous model was fitted on the last cycle's full data, which
+        # overlaps this cycle's test split, so test metrics of a model started
+        # from it are optimistic. They are written as Model_Score rows like
+        # those of a full run; the saved metadata keeps them under their own
+        # names, so a warm-start estimate is not mistaken for a full-run one.
+        test_model = self.__fit(
+            initial_model, params, data_splits, "train_validate_data"
+        )
+        user_codes, item_codes, ratings = data_splits.arrays("test_data")
+        metrics = Evaluator.get_metrics(
+            user_codes, test_model.predict(user_codes, item_codes), ratings
+        )
+        warm_start_metrics = {
+            self.metric_prefix + name: value for name, value in metrics.items()
+        }
+        model = self.__fit(initial_model, params, data_splits, "full_data")
+
+        logger.info(
+            f"Warm start #{metadata['warm_cycles'] + 1}: {self.n_epochs} epochs from "
+            f"the previous model, {round(metrics['RMSE'], 2)} warm-start RMSE, "
+            f"within {round(time.time() - start, 3)} sec."
+        )
+
+        return {
+            "model": model,
+            "params": params,
+            "metrics": metrics,
+            "metadata": self.build_metadata(
+                data_splits,
+                configuration_dict,
+                params,
+                warm_start_metrics,
+                warm_cycles=metadata["warm_cycles"] + 1,
+            ),
+        }
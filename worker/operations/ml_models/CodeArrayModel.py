@@ -0,0 +1,129 @@
+import itertools
+from abc import abstractmethod
+
+import numpy as np
+from loguru import logger
+
+from configurations.config import RATING_SCALE_MAX, RATING_SCALE_MIN, SPLIT_SEED
+from worker.operations.DataSplits import DataSplits
+from worker.operations.Evaluator import Evaluator
+from worker.operations.ml_models.I_Model import I_Model
+from worker.operations.ml_models.TrainingOrchestrator import TrainingOrchestrator
+
+
+class CodeArrayModel(I_Model):
+    # Candidate that trains straight on the shared code arrays of DataSplits.
+    # The grid is ranked on one seeded holdout of the train split, and fits of
+    # the validation, test and final models go through a TrainingOrchestrator.
+    # Subclasses supply the estimator (algo), its grid and how to fit it.
+    algo = None
+    holdout_size = 0.2
+
+    def __init__(self) -> None:
+        self.data_splits: DataSplits = None
+        self.rating_scale = (RATING_SCALE_MIN, RATING_SCALE_MAX)
+        self.orchestrator = TrainingOrchestrator(self.__fit, self._continue_fit)
+
+    @abstractmethod
+    def _param_grid(self, configuration_dict: dict) -> dict:
+        pass
+
+    @abstractmethod
+    def _fit_arrays(
+        self,
+        params: dict,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+    ):
+        pass
+
+    def _continue_fit(self, model, params: dict, split_name: str, n_epochs: int):
+        # Nothing iterative to continue by default: the model is refit.
+        return self.__fit(params, split_name)
+
+    def _configure(self, configuration_dict: dict) -> None:
+        self.orchestrator.configure(configuration_dict)
+
+    def data_preparation(self, data_splits: DataSplits) -> None:
+        self.data_splits = data_splits
+        self.orchestrator.reset()
+
+        logger.debug("Done")
+
+    def __fit(self, params: dict, split_name: str):
+        return self._fit_arrays(params, *self.data_splits.arrays(split_name))
+
+    def __evaluate(self, model, split_name: str) -> dict:
+        user_codes, item_codes, ratings = self.data_splits.arrays(split_name)
+        est = model.predict(user_codes, item_codes)
+
+        return Evaluator.get_metrics(user_codes, est, ratings)
+
+    def hyperparameter_selection(self, configuration_dict: dict) -> dict:
+        param_grid = self._param_grid(configuration_dict)
+
+        user_codes, item_codes, ratings = self.data_splits.arrays("train_data")
+        rng = np.random.default_rng(SPLIT_SEED)
+        in_holdout = rng.random(len(ratings)) < self.holdout_size
+
+        results = []
+        for values in itertools.product(*param_grid.values()):
+            params = dict(zip(param_grid.keys(), values))
+            model = self._fit_arrays(
+                params,
+                user_codes[~in_holdout],
+                item_codes[~in_holdout],
+                ratings[~in_holdout],
+            )
+            est = model.predict(user_codes[in_holdout], item_codes[in_holdout])
+            results.append((params, Evaluator.rmse(est, ratings[in_holdout])))
+
+        params_dict, _ = min(results, key=lambda x: x[1])
+
+        logger.debug("Done")
+
+        return params_dict
+
+    def train_test_model(self, params: dict) -> dict:
+        model = self.orchestrator.fit(params, "train_data")
+        metrics = self.__evaluate(model, "validation_data")
+
+        logger.debug("Done")
+
+        return metrics
+
+    def __get_final_metrics(self, params: dict) -> dict:
+        model = self.orchestrator.fit(params, "train_validate_data")
+        metrics = self.__evaluate(model, "test_data")
+
+        logger.debug("Done")
+
+        return metrics
+
+    def fit_and_validate(
+        self, data_splits: DataSplits, configuration_dict: dict
+    ) -> dict:
+        self.data_preparation(data_splits)
+        self._configure(configuration_dict)
+        params = self.hyperparameter_selection(configuration_dict)
+        metrics = self.train_test_model(params)
+
+        logger.debug("Done")
+
+        return {"model_name": self, "params": params, "metrics": metrics}
+
+    def prepare_final_fit(
+        self, data_splits: DataSplits, configuration_dict: dict
+    ) -> None:
+        self.data_preparation(data_splits)
+        self._configure(configuration_dict)
+
+    def fit_final_model(self, params: dict) -> dict:
+        final_metrics = self.__get_final_metrics(params)
+        trained_model = self.orchestrator.final_model(params)
+
+        logger.debug("Done")
+        logger.info(f"Final model has {round(final_metrics.get('RMSE'), 2)} RMSE")
+
+        return {"model": trained_model, "metrics": final_metrics}
@@ -0,0 +1,257 @@
+import json
+import os
+
+import numpy as np
+from pandas import Index
+from surprise.prediction_algorithms.algo_base import AlgoBase
+
+
+class FactorModel:
+    # Inference-only biased matrix factorization:
+    # est = mu + bu + bi + P[u] . Q[i], indexed by the RatingMatrix codes.
+    # Unknown users/items (no training ratings or code -1) fall back to the
+    # known terms, as surprise's SVD does, and estimates are clipped to the
+    # rating scale.
+    prediction_chunk_size = 1 << 16
+    artifact_format = "factor_model"
+    artifact_version = 1
+    array_names = (
+        "user_bias",
+        "item_bias",
+        "user_factors",
+        "item_factors",
+        "known_users",
+        "known_items",
+        "user_ids",
+        "isbns",
+    )
+
+    def __init__(
+        self,
+        global_mean: float,
+        user_bias: np.ndarray,
+        item_bias: np.ndarray,
+        user_factors: np.ndarray,
+        item_factors: np.ndarray,
+        user_ids: np.ndarray,
+        isbns: np.ndarray,
+        rating_scale: tuple[float, float],
+        known_users: np.ndarray | None = None,
+        known_items: np.ndarray | None = None,
+    ) -> None:
+        self.global_mean = float(global_mean)
+        self.user_bias = np.asarray(user_bias, dtype=np.float32)
+        self.item_bias = np.asarray(item_bias, dtype=np.float32)
+        self.user_factors = np.asarray(user_factors, dtype=np.float32)
+        self.item_factors = np.asarray(item_factors, dtype=np.float32)
+        self.user_ids = np.asarray(user_ids)
+        self.isbns = np.asarray(isbns)
+        self.rating_scale = tuple(rating_scale)
+
+        if known_users is None:
+            known_users = np.ones(len(self.user_bias), dtype=bool)
+        if known_items is None:
+            known_items = np.ones(len(self.item_bias), dtype=bool)
+        self.known_users = np.asarray(known_users, dtype=bool)
+        self.known_items = np.asarray(known_items, dtype=bool)
+
+    @property
+    def n_users(self) -> int:
+        return len(self.user_bias)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_bias)
+
+    @property
+    def n_factors(self) -> int:
+        return self.item_factors.shape[1]
+
+    @staticmethod
+    def __ids_by_inner_id(raw2inner: dict, n_ids: int) -> np.ndarray:
+        ids = np.empty(n_ids, dtype=object)
+        for raw_id, inner_id in raw2inner.items():
+            ids[inner_id] = raw_id
+        return ids
+
+    @classmethod
+    def from_surprise(cls, model: AlgoBase) -> "FactorModel":
+        assert model.biased, "Only biased SVD models can be converted."
+        trainset = model.trainset
+
+        known_users = np.zeros(trainset.n_users, dtype=bool)
+        known_users[list(trainset.ur.keys())] = True
+        known_items = np.zeros(trainset.n_items, dtype=bool)
+        known_items[list(trainset.ir.keys())] = True
+
+        return cls(
+            global_mean=trainset.global_mean,
+            user_bias=model.bu,
+            item_bias=model.bi,
+            user_factors=model.pu,
+            item_factors=model.qi,
+            user_ids=cls.__ids_by_inner_id(
+                trainset._raw2inner_id_users, trainset.n_users
+            ),
+            isbns=cls.__ids_by_inner_id(trainset._raw2inner_id_items, trainset.n_items),
+            rating_scale=trainset.rating_scale,
+            known_users=known_users,
+            known_items=known_items,
+        )
+
+    @staticmethod
+    def __mappable_ids(ids: np.ndarray) -> np.ndarray:
+        # Object id arrays (e.g. from surprise) become int64 or fixed-width str
+        # arrays, which np.load can map without unpickling.
+        ids = np.asarray(ids)
+        if ids.dtype != object:
+            return ids
+        if all(isinstance(raw_id, (int, np.integer)) for raw_id in ids):
+            return ids.astype(np.int64)
+        return ids.astype(str)
+
+    def save(self, directory: str) -> None:
+        # One .npy file per array (the format aligns the data, so it can be
+        # memory-mapped) and manifest.json, written last, with the scalars.
+        os.makedirs(directory, exist_ok=True)
+        manifest = {
+            "format": self.artifact_format,
+            "version": self.artifact_version,
+            "global_mean": self.global_mean,
+            "rating_scale": list(self.rating_scale),
+            "arrays": {},
+        }
+        for name in self.array_names:
+            array = getattr(self, name)
+            if name in ("user_ids", "isbns"):
+                array = self.__mappable_ids(array)
+            array = np.ascontiguousarray(array)
+            np.save(os.path.join(directory, name + ".npy"), array, allow_pickle=False)
+            manifest["arrays"][name] = {
+                "file": name + ".npy",
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+            }
+
+        with open(os.path.join(directory, "manifest.json"), "w") as file:
+            json.dump(manifest, file, default=str)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: str | None = "r") -> "FactorModel":
+        # With mmap_mode="r" nothing is read up front: processes serving the
+        # same artifact share its pages through the OS page cache.
+        with open(os.path.join(directory, "manifest.json")) as file:
+            manifest = json.load(file)
+        assert manifest["format"] == cls.artifact_format, "Not a factor model."
+        assert manifest["version"] <= cls.artifact_version, "Unknown version."
+
+        arrays = {
+            name: np.load(
+                os.path.join(directory, entry["file"]),
+                mmap_mode=mmap_mode,
+                allow_pickle=False,
+            )
+            for name, entry in manifest["arrays"].items()
+        }
+
+        return cls(
+            global_mean=manifest["global_mean"],
+            rating_scale=tuple(manifest["rating_scale"]),
+            **arrays,
+        )
+
+    def reindex(
+        self,
+        user_ids: np.ndarray,
+        isbns: np.ndarray,
+        init_std_dev: float = 0.1,
+        random_state: int | None = None,
+    ) -> "FactorModel":
+        # Moves the model onto another id encoding (e.g. a newer RatingMatrix).
+        # Rows of ids this model knows are carried over; new ids get zero biases,
+        # small random factors and are marked unknown until they are trained.
+        rng = np.random.default_rng(random_state)
+        user_rows = Index(self.user_ids).get_indexer(user_ids)
+        item_rows = Index(self.isbns).get_indexer(isbns)
+
+        def carry(values: np.ndarray, rows: np.ndarray, new_values: np.ndarray):
+            found = rows >= 0
+            new_values[found] = values[rows[found]]
+            return new_values
+
+        def normal(n_rows: int) -> np.ndarray:
+            return rng.normal(0, init_std_dev, (n_rows, self.n_factors)).astype(
+                np.float32
+            )
+
+        return FactorModel(
+            global_mean=self.global_mean,
+            user_bias=carry(self.user_bias, user_rows, np.zeros(len(user_rows))),
+            item_bias=carry(self.item_bias, item_rows, np.zeros(len(item_rows))),
+            user_factors=carry(self.user_factors, user_rows, normal(len(user_rows))),
+            item_factors=carry(self.item_factors, item_rows, normal(len(item_rows))),
+            user_ids=user_ids,
+            isbns=isbns,
+            rating_scale=self.rating_scale,
+            known_users=carry(
+                self.known_users, user_rows, np.zeros(len(user_rows), dtype=bool)
+            ),
+            known_items=carry(
+                self.known_items, item_rows, np.zeros(len(item_rows), dtype=bool)
+            ),
+        )
+
+    def predict(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        chunk_size: int | None = None,
+    ) -> np.ndarray:
+        user_codes = np.asarray(user_codes)
+        item_codes = np.asarray(item_codes)
+        chunk_size = chunk_size or self.prediction_chunk_size
+        lower_bound, higher_bound = self.rating_scale
+        estimates = np.empty(len(user_codes), dtype=np.float64)
+
+        for start in range(0, len(user_codes), chunk_size):
+            users = user_codes[start : start + chunk_size]
+            items = item_codes[start : start + chunk_size]
+
+            known_user = users >= 0
+            known_user[known_user] = self.known_users[users[known_user]]
+            known_item = items >= 0
+            known_item[known_item] = self.known_items[items[known_item]]
+            both_known = known_user & known_item
+
+            # Unknown codes are redirected to row 0 and masked out below.
+            users = np.where(known_user, users, 0)
+            items = np.where(known_item, items, 0)
+
+            est = np.full(len(users), self.global_mean)
+            est += np.where(known_user, self.user_bias[users], 0.0)
+            est += np.where(known_item, self.item_bias[items], 0.0)
+            dot = np.einsum(
+                "ij,ij->i", self.user_factors[users], self.item_factors[items]
+            )
+            est += np.where(both_known, dot, 0.0)
+
+            estimates[start : start + chunk_size] = est
+
+        return np.clip(estimates, lower_bound, higher_bound)
+
+    def score_all(self, user_codes: np.ndarray) -> np.ndarray:
+        # Estimates of every item for a block of users as one matrix product:
+        # (len(user_codes), n_items) float32, with predict()'s fallbacks and
+        # clipping.
+        user_codes = np.asarray(user_codes)
+        known_user = user_codes >= 0
+        known_user[known_user] = self.known_users[user_codes[known_user]]
+        users = np.where(known_user, user_codes, 0)
+
+        scores = self.user_factors[users] @ self.item_factors.T
+        scores *= self.known_items
+        scores *= known_user[:, None]
+        scores += np.float32(self.global_mean) + self.item_bias * self.known_items
+        scores += (self.user_bias[users] * known_user)[:, None]
+
+        return np.clip(scores, *self.rating_scale, out=scores)
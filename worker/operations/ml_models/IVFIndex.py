@@ -0,0 +1,196 @@
+import time
+
+import numpy as np
+from loguru import logger
+
+
+class IVFIndex:
+    # Inverted-file index for maximum-inner-product top-K over item factors.
+    # For a known user the ranking of books is the ranking of
+    # [q_i, b_i] . [p_u, 1] (global mean and user bias are constant), so
+    # items are indexed as x_i = [q_i, b_i]. Appending sqrt(M^2 - |x_i|^2)
+    # turns inner product search into nearest-neighbour search, which k-means
+    # partitions well. A query only scores the items of its n_probe best
+    # lists: more probes, higher recall, slower queries.
+    block_size = 1 << 14
+
+    def __init__(
+        self,
+        centroids: np.ndarray,
+        list_offsets: np.ndarray,
+        item_codes: np.ndarray,
+        item_vectors: np.ndarray,
+        n_probe: int = 8,
+    ) -> None:
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        # Items are stored grouped by list: list l holds
+        # item_codes[list_offsets[l] : list_offsets[l + 1]].
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        self.item_codes = np.asarray(item_codes, dtype=np.int32)
+        self.item_vectors = np.asarray(item_vectors, dtype=np.float32)
+        self.n_probe = int(n_probe)
+
+        self.__centroid_norms = (self.centroids**2).sum(axis=1)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_codes)
+
+    @staticmethod
+    def __augment(vectors: np.ndarray, max_norm: float) -> np.ndarray:
+        norms = (vectors**2).sum(axis=1)
+        extra = np.sqrt(np.maximum(max_norm**2 - norms, 0))
+        return np.hstack([vectors, extra[:, None]]).astype(np.float32)
+
+    @classmethod
+    def __assign(cls, points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # Nearest centroid of every point, one block of points at a time.
+        centroid_norms = (centroids**2).sum(axis=1)
+        labels = np.empty(len(points), dtype=np.int32)
+        for start in range(0, len(points), cls.block_size):
+            block = points[start : start + cls.block_size]
+            distances = centroid_norms - 2 * block @ centroids.T
+            labels[start : start + cls.block_size] = distances.argmin(axis=1)
+        return labels
+
+    @classmethod
+    def __kmeans(
+        cls,
+        points: np.ndarray,
+        n_lists: int,
+        n_iter: int,
+        rng: np.random.Generator,
+    ) -> np.ndarray:
+        centroids = points[rng.choice(len(points), n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            labels = cls.__assign(points, centroids)
+            counts = np.bincount(labels, minlength=n_lists)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, points)
+
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Empty lists restart from random points.
+            empty = np.flatnonzero(~filled)
+            centroids[empty] = points[rng.choice(len(points), len(empty))]
+
+        return centroids
+
+    @classmethod
+    def build(
+        cls,
+        item_factors: np.ndarray,
+        item_bias: np.ndarray,
+        known_items: np.ndarray | None = None,
+        n_lists: int | None = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        sample_size: int = 256,
+        random_state: int | None = None,
+    ) -> "IVFIndex":
+        # Only known items are indexed; the rest can never be recommended.
+        # ``sample_size`` is the number of training points per list for
+        # k-means; all items are assigned afterwards.
+        start = time.time()
+        rng = np.random.default_rng(random_state)
+        if known_items is None:
+            known_items = np.ones(len(item_bias), dtype=bool)
+        item_codes = np.flatnonzero(known_items).astype(np.int32)
+
+        item_vectors = np.hstack(
+            [item_factors[item_codes], item_bias[item_codes, None]]
+        ).astype(np.float32)
+        max_norm = float(np.sqrt((item_vectors**2).sum(axis=1).max(initial=0)))
+        points = cls.__augment(item_vectors, max_norm)
+
+        n_lists = n_lists or int(np.sqrt(len(points)))
+        n_lists = max(min(n_lists, len(points)), 1)
+        sample = points
+        if len(points) > n_lists * sample_size:
+            sample = points[rng.choice(len(points), n_lists * sample_size, False)]
+        centroids = cls.__kmeans(sample, n_lists, n_iter, rng)
+
+        labels = cls.__assign(points, centroids)
+        order = np.argsort(labels, kind="stable")
+        list_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(labels, minlength=n_lists))]
+        )
+
+        logger.debug(
+            f"IVF index: {len(item_codes)} items in {n_lists} lists within "
+            f"{round(time.time() - start, 3)} sec."
+        )
+
+        return cls(
+            centroids=centroids,
+            list_offsets=list_offsets,
+            item_codes=item_codes[order],
+            item_vectors=item_vectors[order],
+            n_probe=n_probe,
+        )
+
+    def save(self, filepath: str) -> None:
+        with open(filepath, "wb") as file:
+            np.savez(
+                file,
+                centroids=self.centroids,
+                list_offsets=self.list_offsets,
+                item_codes=self.item_codes,
+                item_vectors=self.item_vectors,
+                n_probe=self.n_probe,
+            )
+
+    @classmethod
+    def load(cls, filepath: str) -> "IVFIndex":
+        with np.load(filepath, allow_pickle=False) as arrays:
+            return cls(
+                centroids=arrays["centroids"],
+                list_offsets=arrays["list_offsets"],
+                item_codes=arrays["item_codes"],
+                item_vectors=arrays["item_vectors"],
+                n_probe=int(arrays["n_probe"]),
+            )
+
+    def probe(self, queries: np.ndarray, n_probe: int | None = None) -> np.ndarray:
+        # The n_probe lists closest to every query, in the augmented space
+        # where queries get a 0 as last coordinate.
+        n_probe = min(n_probe or self.n_probe, self.n_lists)
+        scores = 2 * queries @ self.centroids[:, :-1].T - self.__centroid_norms
+        return np.argpartition(-scores, n_probe - 1, axis=1)[:, :n_probe]
+
+    def candidates(
+        self, queries: np.ndarray, n_probe: int | None = None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        # (item codes, inner products) of all items in the probed lists of
+        # every query, in list order.
+        queries = np.asarray(queries, dtype=np.float32)
+        results = []
+        for query, lists in zip(queries, self.probe(queries, n_probe)):
+            starts, stops = self.list_offsets[lists], self.list_offsets[lists + 1]
+            rows = np.concatenate(
+                [np.arange(start, stop) for start, stop in zip(starts, stops)]
+            )
+            results.append((self.item_codes[rows], self.item_vectors[rows] @ query))
+
+        return results
+
+    def search(
+        self, queries: np.ndarray, k: int, n_probe: int | None = None
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        # Approximate top-k (item codes, inner products) per query, best first.
+        results = []
+        for item_codes, scores in self.candidates(queries, n_probe):
+            n = min(k, len(scores))
+            top = (
+                np.argpartition(-scores, n - 1)[:n]
+                if n > 0
+                else np.array([], dtype=np.int64)
+            )
+            top = top[np.argsort(-scores[top], kind="stable")]
+            results.append((item_codes[top], scores[top]))
+
+        return results
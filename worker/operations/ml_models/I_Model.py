@@ -1,10 +1,12 @@
 from abc import ABC, abstractmethod
 
+from worker.operations.DataSplits import DataSplits
+
 
 class I_Model(ABC):
 
     @abstractmethod
-    def data_preparation(self, dataframes: dict):
+    def data_preparation(self, data_splits: DataSplits):
         pass
 
     @abstractmethod
@@ -17,9 +19,18 @@ class I_Model(ABC):
         pass
 
     @abstractmethod
-    def fit_and_validate(self, dataframes: dict, configuration_dict: dict) -> dict:
+    def fit_and_validate(
+        self, data_splits: DataSplits, configuration_dict: dict
+    ) -> dict:
         pass
 
     @abstractmethod
     def fit_final_model(self, params: dict) -> dict:
         pass
+
+    def prepare_final_fit(
+        self, data_splits: DataSplits, configuration_dict: dict
+    ) -> None:
+        # Restores what fit_final_model() needs when fit_and_validate() ran in
+        # another process.
+        self.data_preparation(data_splits)
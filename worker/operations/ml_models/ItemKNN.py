@@ -0,0 +1,36 @@
+import numpy as np
+
+from worker.operations.ml_models.CodeArrayModel import CodeArrayModel
+from worker.operations.ml_models.ItemKNNIndex import ItemKNNIndex
+
+
+class ItemKNNModel(CodeArrayModel):
+    algo = ItemKNNIndex
+
+    def _param_grid(self, configuration_dict: dict) -> dict:
+        hyperparameter_config = configuration_dict["Model_Hyperparameter_Config"]
+        return {
+            "k": hyperparameter_config.get("KNN_K", [20, 40]),
+            "similarity": hyperparameter_config.get(
+                "KNN_Similarity", list(self.algo.similarity_kinds)
+            ),
+        }
+
+    def _fit_arrays(
+        self,
+        params: dict,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+    ) -> ItemKNNIndex:
+        rating_matrix = self.data_splits.rating_matrix
+
+        return self.algo.fit(
+            user_codes,
+            item_codes,
+            ratings,
+            user_ids=rating_matrix.user_ids,
+            isbns=rating_matrix.isbns,
+            rating_scale=self.rating_scale,
+            **params,
+        )
@@ -0,0 +1,262 @@
+import time
+
+import numpy as np
+from loguru import logger
+from scipy.sparse import csc_matrix, csr_matrix, vstack
+
+
+class ItemKNNIndex:
+    # Item-based collaborative filtering over RatingMatrix codes:
+    # est(u, j) = mu_j + sum_i s_ji * (r_ui - mu_i) / sum_i |s_ji|
+    # over the top-k neighbours i of j that u has rated. Only the top-k
+    # similarities per item are kept, as an n_items x n_items CSR matrix, and
+    # the full item x item product is never materialized.
+    similarity_kinds = ("cosine", "adjusted_cosine")
+    block_size = 1024
+    prediction_chunk_size = 1 << 14
+
+    def __init__(
+        self,
+        similarities: csr_matrix,
+        user_ratings: csr_matrix,
+        global_mean: float,
+        item_means: np.ndarray,
+        user_ids: np.ndarray,
+        isbns: np.ndarray,
+        rating_scale: tuple[float, float],
+        known_items: np.ndarray | None = None,
+    ) -> None:
+        self.similarities = similarities
+        # Training ratings centred on the item means, one row per user.
+        self.user_ratings = user_ratings
+        self.global_mean = float(global_mean)
+        self.item_means = np.asarray(item_means, dtype=np.float32)
+        self.user_ids = np.asarray(user_ids)
+        self.isbns = np.asarray(isbns)
+        self.rating_scale = tuple(rating_scale)
+
+        if known_items is None:
+            known_items = np.ones(len(self.item_means), dtype=bool)
+        self.known_items = np.asarray(known_items, dtype=bool)
+
+        # Transposed similarities, set up by the first score_all().
+        self.__neighbours_of: csr_matrix | None = None
+        self.__abs_neighbours_of: csr_matrix | None = None
+        self.__rating_keys: np.ndarray | None = None
+
+    @property
+    def n_users(self) -> int:
+        return self.user_ratings.shape[0]
+
+    @property
+    def n_items(self) -> int:
+        return self.user_ratings.shape[1]
+
+    @staticmethod
+    def __top_k_rows(block: csr_matrix, k: int) -> csr_matrix:
+        # Keeps the k largest entries of every row of a sparse block.
+        block.sum_duplicates()
+        row_ids = np.repeat(np.arange(block.shape[0]), np.diff(block.indptr))
+        order = np.lexsort((-block.data, row_ids))
+        rank = np.arange(len(order)) - block.indptr[row_ids[order]]
+        keep = order[rank < k]
+
+        return csr_matrix(
+            (block.data[keep], (row_ids[keep], block.indices[keep])),
+            shape=block.shape,
+            dtype=np.float32,
+        )
+
+    @classmethod
+    def fit(
+        cls,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        user_ids: np.ndarray,
+        isbns: np.ndarray,
+        rating_scale: tuple[float, float],
+        k: int = 40,
+        similarity: str = "cosine",
+        block_size: int | None = None,
+    ) -> "ItemKNNIndex":
+        if similarity not in cls.similarity_kinds:
+            raise ValueError(f"Unknown similarity '{similarity}'.")
+        start = time.time()
+        block_size = block_size or cls.block_size
+        n_users, n_items = len(user_ids), len(isbns)
+        ratings = np.asarray(ratings, dtype=np.float32)
+        global_mean = float(ratings.mean()) if len(ratings) else 0.0
+
+        item_counts = np.bincount(item_codes, minlength=n_items)
+        item_sums = np.bincount(item_codes, weights=ratings, minlength=n_items)
+        known_items = item_counts > 0
+        item_means = np.where(
+            known_items, item_sums / np.maximum(item_counts, 1), global_mean
+        )
+
+        # Cosine works on the raw ratings, adjusted cosine on ratings centred
+        # on the user means.
+        vectors = ratings.astype(np.float64)
+        if similarity == "adjusted_cosine":
+            user_counts = np.bincount(user_codes, minlength=n_users)
+            user_sums = np.bincount(user_codes, weights=ratings, minlength=n_users)
+            vectors = vectors - (user_sums / np.maximum(user_counts, 1))[user_codes]
+
+        item_vectors = csc_matrix(
+            (vectors, (user_codes, item_codes)), shape=(n_users, n_items)
+        )
+        item_vectors.sum_duplicates()
+        norms = np.sqrt(np.asarray(item_vectors.multiply(item_vectors).sum(axis=0)))
+        norms = np.where(norms[0] > 0, norms[0], 1.0)
+        item_vectors = item_vectors @ csr_matrix(
+            (1.0 / norms, (np.arange(n_items), np.arange(n_items))),
+            shape=(n_items, n_items),
+        )
+        items_by_user = item_vectors.T.tocsr()
+
+        # One block of item rows at a time: (block x n_items) similarities,
+        # self-similarity dropped, truncated to the top k.
+        blocks = []
+        for block_start in range(0, n_items, block_size):
+            block_stop = min(block_start + block_size, n_items)
+            block = (items_by_user[block_start:block_stop] @ item_vectors).tocoo()
+            not_self = block.row + block_start != block.col
+            block = csr_matrix(
+                (block.data[not_self], (block.row[not_self], block.col[not_self])),
+                shape=(block_stop - block_start, n_items),
+            )
+            blocks.append(cls.__top_k_rows(block, k))
+        similarities = (
+            vstack(blocks, format="csr")
+            if blocks
+            else csr_matrix((0, n_items), dtype=np.float32)
+        )
+
+        user_ratings = csr_matrix(
+            (
+                ratings - item_means[item_codes],
+                (user_codes, item_codes),
+            ),
+            shape=(n_users, n_items),
+            dtype=np.float32,
+        )
+        user_ratings.sum_duplicates()
+        user_ratings.sort_indices()
+
+        logger.debug(
+            f"Item kNN ({similarity}, k={k}): {similarities.nnz} similarities for "
+            f"{n_items} items within {round(time.time() - start, 3)} sec."
+        )
+
+        return cls(
+            similarities=similarities,
+            user_ratings=user_ratings,
+            global_mean=global_mean,
+            item_means=item_means,
+            user_ids=user_ids,
+            isbns=isbns,
+            rating_scale=rating_scale,
+            known_items=known_items,
+        )
+
+    def __rated_deviations(
+        self, users: np.ndarray, neighbours: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        # Looks up r_ui - mu_i for many (u, i) pairs at once: user_ratings has
+        # sorted indices, so its flattened (u * n_items + i) keys are sorted too.
+        if self.__rating_keys is None:
+            stored_users = np.repeat(
+                np.arange(self.n_users, dtype=np.int64),
+                np.diff(self.user_ratings.indptr),
+            )
+            self.__rating_keys = stored_users * self.n_items + self.user_ratings.indices
+
+        keys = users.astype(np.int64) * self.n_items + neighbours
+        positions = np.searchsorted(self.__rating_keys, keys)
+        positions = np.minimum(positions, max(len(self.__rating_keys) - 1, 0))
+        found = (
+            self.__rating_keys[positions] == keys
+            if len(self.__rating_keys)
+            else np.zeros(len(keys), dtype=bool)
+        )
+
+        return found, np.where(found, self.user_ratings.data[positions], 0.0)
+
+    def predict(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        chunk_size: int | None = None,
+    ) -> np.ndarray:
+        user_codes = np.asarray(user_codes)
+        item_codes = np.asarray(item_codes)
+        chunk_size = chunk_size or self.prediction_chunk_size
+        lower_bound, higher_bound = self.rating_scale
+        estimates = np.empty(len(user_codes), dtype=np.float64)
+        indptr = self.similarities.indptr
+
+        for start in range(0, len(user_codes), chunk_size):
+            users = user_codes[start : start + chunk_size]
+            items = item_codes[start : start + chunk_size]
+
+            known_item = items >= 0
+            known_item[known_item] = self.known_items[items[known_item]]
+            est = np.full(len(users), self.global_mean)
+            est[known_item] = self.item_means[items[known_item]]
+
+            # Expand every (u, j) pair into its (u, i) neighbour pairs.
+            pairs = np.flatnonzero(known_item & (users >= 0))
+            lengths = indptr[items[pairs] + 1] - indptr[items[pairs]]
+            pair_ids = np.repeat(np.arange(len(pairs)), lengths)
+            offsets = np.arange(len(pair_ids)) - np.repeat(
+                np.cumsum(lengths) - lengths, lengths
+            )
+            entries = np.repeat(indptr[items[pairs]], lengths) + offsets
+            found, deviations = self.__rated_deviations(
+                users[pairs][pair_ids], self.similarities.indices[entries]
+            )
+            weights = np.where(found, self.similarities.data[entries], 0.0)
+
+            numerator = np.bincount(
+                pair_ids, weights=weights * deviations, minlength=len(pairs)
+            )
+            denominator = np.bincount(
+                pair_ids, weights=np.abs(weights), minlength=len(pairs)
+            )
+            has_neighbours = denominator > 0
+            est[pairs[has_neighbours]] += (
+                numerator[has_neighbours] / denominator[has_neighbours]
+            )
+
+            estimates[start : start + chunk_size] = est
+
+        return np.clip(estimates, lower_bound, higher_bound)
+
+    def score_all(self, user_codes: np.ndarray) -> np.ndarray:
+        # Estimates of every item for a block of users, the same as predict()
+        # over all (user, item) pairs, from two sparse products: the users'
+        # rated deviations and rated indicators times the (absolute)
+        # similarities. Unknown users (code -1) get the item means.
+        if self.__neighbours_of is None:
+            self.__neighbours_of = self.similarities.T.tocsr()
+            self.__abs_neighbours_of = abs(self.__neighbours_of)
+
+        user_codes = np.asarray(user_codes)
+        known_users = np.flatnonzero(user_codes >= 0)
+        deviations = self.user_ratings[user_codes[known_users]]
+        rated = deviations.copy()
+        rated.data = np.ones_like(rated.data)
+
+        numerator = (deviations @ self.__neighbours_of).toarray()
+        denominator = (rated @ self.__abs_neighbours_of).toarray()
+        has_neighbours = denominator > 0
+
+        scores = np.tile(self.item_means, (len(user_codes), 1))
+        known_scores = scores[known_users]
+        known_scores[has_neighbours] += (
+            numerator[has_neighbours] / denominator[has_neighbours]
+        )
+        scores[known_users] = known_scores
+
+        return np.clip(scores, *self.rating_scale, out=scores)
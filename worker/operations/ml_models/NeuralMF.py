@@ -0,0 +1,321 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from loguru import logger
+
+
+class RatingBatches:
+    # Mini-batches over the encoded rating arrays. Every batch of observed
+    # ratings is followed by ``negative_ratio`` sampled (user, random book)
+    # pairs per rating, labelled with the lowest rating and down-weighted.
+
+    def __init__(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        batch_size: int,
+        negative_ratio: int,
+        negative_rating: float,
+        negative_weight: float,
+    ) -> None:
+        self.user_codes = user_codes
+        self.item_codes = item_codes
+        self.ratings = np.asarray(ratings, dtype=np.float32)
+        self.batch_size = batch_size
+        self.negative_ratio = negative_ratio
+        self.negative_rating = np.float32(negative_rating)
+        self.negative_weight = np.float32(negative_weight)
+        self.candidate_items = np.unique(item_codes)
+
+    def split(self, rng: np.random.Generator, n_shards: int) -> list[np.ndarray]:
+        # One epoch's shuffled row order, cut into per-thread shards of
+        # whole batches.
+        order = rng.permutation(len(self.ratings))
+        batches = [
+            order[start : start + self.batch_size]
+            for start in range(0, len(order), self.batch_size)
+        ]
+        return [batches[shard::n_shards] for shard in range(n_shards)]
+
+    def load(
+        self, rows: np.ndarray, rng: np.random.Generator
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        users, items = self.user_codes[rows], self.item_codes[rows]
+        ratings = self.ratings[rows]
+        weights = np.ones(len(rows), dtype=np.float32)
+
+        n_negatives = len(rows) * self.negative_ratio
+        if n_negatives:
+            users = np.concatenate([users, rng.choice(users, n_negatives)])
+            items = np.concatenate(
+                [items, rng.choice(self.candidate_items, n_negatives)]
+            )
+            ratings = np.concatenate(
+                [ratings, np.full(n_negatives, self.negative_rating)]
+            )
+            weights = np.concatenate(
+                [weights, np.full(n_negatives, self.negative_weight)]
+            )
+
+        return users, items, ratings, weights
+
+
+class NeuralMF:
+    # CPU neural matrix factorization in NumPy (NeuMF): a GMF branch (P[u] * Q[i])
+    # and an MLP branch (one ReLU layer over [U[u], V[i]]) are combined with
+    # user/item biases into a sigmoid scaled to the rating scale.
+    # Embedding rows get per-rating SGD steps (averaged over repeats in a
+    # batch), the dense layers get the batch-mean gradient. Threads train
+    # disjoint shards of every epoch lock-free on the shared weights (Hogwild).
+    # This is best-effort: only the matrix products release the GIL, while
+    # np.add.at and the fancy-indexed embedding updates hold it, so threads
+    # speed up the dense layers more than the embedding steps.
+
+    def __init__(
+        self,
+        n_factors: int = 32,
+        n_hidden: int = 32,
+        n_epochs: int = 20,
+        lr: float = 0.05,
+        reg: float = 0.001,
+        batch_size: int = 1024,
+        negative_ratio: int = 1,
+        negative_weight: float = 0.1,
+        n_threads: int = 1,
+        time_budget: float | None = None,
+        init_std_dev: float = 0.1,
+        random_state: int | None = None,
+    ) -> None:
+        self.n_factors = int(n_factors)
+        self.n_hidden = int(n_hidden)
+        self.n_epochs = int(n_epochs)
+        self.lr = np.float32(lr)
+        self.reg = np.float32(reg)
+        self.batch_size = int(batch_size)
+        self.negative_ratio = int(negative_ratio)
+        self.negative_weight = negative_weight
+        self.n_threads = max(int(n_threads), 1)
+        self.time_budget = time_budget
+        self.init_std_dev = init_std_dev
+        self.random_state = random_state
+
+        self.weights: dict[str, np.ndarray] = {}
+        self.known_users: np.ndarray = None
+        self.known_items: np.ndarray = None
+        self.user_ids: np.ndarray = None
+        self.isbns: np.ndarray = None
+        self.rating_scale: tuple[float, float] = None
+
+    def __init_weights(
+        self, rng: np.random.Generator, n_users: int, n_items: int, mean: float
+    ) -> None:
+        def normal(shape, std):
+            return rng.normal(0, std, shape).astype(np.float32)
+
+        lower_bound, higher_bound = self.rating_scale
+        scaled_mean = (mean - lower_bound) / (higher_bound - lower_bound)
+        scaled_mean = min(max(scaled_mean, 1e-3), 1 - 1e-3)
+
+        self.weights = {
+            "P": normal((n_users, self.n_factors), self.init_std_dev),
+            "Q": normal((n_items, self.n_factors), self.init_std_dev),
+            "U": normal((n_users, self.n_factors), self.init_std_dev),
+            "V": normal((n_items, self.n_factors), self.init_std_dev),
+            "user_bias": np.zeros(n_users, dtype=np.float32),
+            "item_bias": np.zeros(n_items, dtype=np.float32),
+            "W1": normal(
+                (2 * self.n_factors, self.n_hidden), np.sqrt(1 / self.n_factors)
+            ),
+            "b1": np.zeros(self.n_hidden, dtype=np.float32),
+            "w_gmf": np.ones(self.n_factors, dtype=np.float32),
+            "w_mlp": normal(self.n_hidden, np.sqrt(1 / self.n_hidden)),
+            "b": np.array(np.log(scaled_mean / (1 - scaled_mean)), dtype=np.float32),
+        }
+
+    def __forward(
+        self,
+        users: np.ndarray,
+        items: np.ndarray,
+        known_user: np.ndarray | None = None,
+        known_item: np.ndarray | None = None,
+    ) -> tuple:
+        w = self.weights
+        p, q, a, c = w["P"][users], w["Q"][items], w["U"][users], w["V"][items]
+        bu, bi = w["user_bias"][users], w["item_bias"][items]
+        if known_user is not None:
+            # Untrained users/books contribute nothing, as in FactorModel.
+            p, a, bu = p * known_user[:, None], a * known_user[:, None], bu * known_user
+            q, c, bi = q * known_item[:, None], c * known_item[:, None], bi * known_item
+
+        gmf = p * q
+        x = np.concatenate([a, c], axis=1)
+        pre = x @ w["W1"] + w["b1"]
+        h = np.maximum(pre, 0)
+        z = gmf @ w["w_gmf"] + h @ w["w_mlp"] + w["b"] + bu + bi
+        s = 1 / (1 + np.exp(-z))
+
+        return s, (p, q, a, c, gmf, x, pre, h)
+
+    @staticmethod
+    def __batch_counts(codes: np.ndarray) -> np.ndarray:
+        # How often each entry's code occurs in the batch, without an array
+        # over all codes per batch.
+        _, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+        return counts[inverse]
+
+    def __train_batch(
+        self,
+        users: np.ndarray,
+        items: np.ndarray,
+        ratings: np.ndarray,
+        sample_weights: np.ndarray,
+    ) -> float:
+        w, lr, reg = self.weights, self.lr, self.reg
+        lower_bound, higher_bound = self.rating_scale
+        span = np.float32(higher_bound - lower_bound)
+
+        s, (p, q, a, c, gmf, x, pre, h) = self.__forward(users, items)
+        err = lower_bound + span * s - ratings
+        # d(weight * err^2) / dz, per rating.
+        dz = 2 * sample_weights * err * span * s * (1 - s)
+        dz = dz.astype(np.float32)
+
+        dgmf = dz[:, None] * w["w_gmf"]
+        dh = dz[:, None] * w["w_mlp"]
+        dpre = dh * (pre > 0)
+        dx = dpre @ w["W1"].T
+
+        user_lr = (lr / self.__batch_counts(users)).astype(np.float32)[:, None]
+        item_lr = (lr / self.__batch_counts(items)).astype(np.float32)[:, None]
+        n_factors = self.n_factors
+
+        np.add.at(w["P"], users, -user_lr * (dgmf * q + reg * p))
+        np.add.at(w["Q"], items, -item_lr * (dgmf * p + reg * q))
+        np.add.at(w["U"], users, -user_lr * (dx[:, :n_factors] + reg * a))
+        np.add.at(w["V"], items, -item_lr * (dx[:, n_factors:] + reg * c))
+        np.add.at(w["user_bias"], users, -user_lr[:, 0] * dz)
+        np.add.at(w["item_bias"], items, -item_lr[:, 0] * dz)
+
+        n_rows = np.float32(len(dz))
+        w["W1"] -= lr * (x.T @ dpre / n_rows + reg * w["W1"])
+        w["b1"] -= lr * dpre.mean(axis=0)
+        w["w_gmf"] -= lr * (gmf.T @ dz / n_rows)
+        w["w_mlp"] -= lr * (h.T @ dz / n_rows)
+        w["b"] -= lr * dz.mean()
+
+        return float(np.dot(sample_weights * err, err))
+
+    def __train_shard(
+        self,
+        batches: RatingBatches,
+        shard: list[np.ndarray],
+        rng: np.random.Generator,
+        deadline: float | None,
+    ) -> float:
+        loss = 0.0
+        for rows in shard:
+            if deadline is not None and time.time() > deadline:
+                break
+            loss += self.__train_batch(*batches.load(rows, rng))
+        return loss
+
+    def fit(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        user_ids: np.ndarray,
+        isbns: np.ndarray,
+        rating_scale: tuple[float, float],
+        warm_start: bool = False,
+    ) -> "NeuralMF":
+        # With ``warm_start`` an already fitted model keeps its weights (same
+        # code space) and trains n_epochs more.
+        start = time.time()
+        deadline = start + self.time_budget if self.time_budget else None
+        rng = np.random.default_rng(self.random_state)
+        n_users, n_items = len(user_ids), len(isbns)
+        self.user_ids, self.isbns = user_ids, isbns
+        self.rating_scale = tuple(rating_scale)
+
+        ratings = np.asarray(ratings, dtype=np.float32)
+        known_users = np.bincount(user_codes, minlength=n_users) > 0
+        known_items = np.bincount(item_codes, minlength=n_items) > 0
+        if warm_start and self.weights:
+            known_users |= self.known_users
+            known_items |= self.known_items
+        else:
+            self.__init_weights(rng, n_users, n_items, float(ratings.mean()))
+        self.known_users, self.known_items = known_users, known_items
+
+        batches = RatingBatches(
+            user_codes,
+            item_codes,
+            ratings,
+            batch_size=self.batch_size,
+            negative_ratio=self.negative_ratio,
+            negative_rating=self.rating_scale[0],
+            negative_weight=self.negative_weight,
+        )
+        thread_rngs = [
+            np.random.default_rng(seed)
+            for seed in rng.integers(2**32, size=self.n_threads)
+        ]
+
+        epochs_done, loss = 0, None
+        with ThreadPoolExecutor(max_workers=self.n_threads) as executor:
+            for _ in range(self.n_epochs):
+                if deadline is not None and time.time() > deadline:
+                    break
+                shards = batches.split(rng, self.n_threads)
+                losses = executor.map(
+                    self.__train_shard,
+                    [batches] * self.n_threads,
+                    shards,
+                    thread_rngs,
+                    [deadline] * self.n_threads,
+                )
+                loss = sum(losses) / max(len(ratings) * (1 + self.negative_ratio), 1)
+                epochs_done += 1
+
+        logger.debug(
+            f"Neural MF: {epochs_done}/{self.n_epochs} epochs over {len(ratings)} "
+            f"ratings on {self.n_threads} threads, weighted loss {loss}, "
+            f"within {round(time.time() - start, 3)} sec."
+        )
+
+        return self
+
+    def predict(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        chunk_size: int = 1 << 16,
+    ) -> np.ndarray:
+        user_codes = np.asarray(user_codes)
+        item_codes = np.asarray(item_codes)
+        lower_bound, higher_bound = self.rating_scale
+        estimates = np.empty(len(user_codes), dtype=np.float64)
+
+        for start in range(0, len(user_codes), chunk_size):
+            users = user_codes[start : start + chunk_size]
+            items = item_codes[start : start + chunk_size]
+            known_user = users >= 0
+            known_user[known_user] = self.known_users[users[known_user]]
+            known_item = items >= 0
+            known_item[known_item] = self.known_items[items[known_item]]
+
+            # Unknown codes are redirected to row 0 and masked out.
+            s, _ = self.__forward(
+                np.where(known_user, users, 0),
+                np.where(known_item, items, 0),
+                known_user,
+                known_item,
+            )
+            estimates[start : start + chunk_size] = (
+                lower_bound + (higher_bound - lower_bound) * s
+            )
+
+        return np.clip(estimates, lower_bound, higher_bound)
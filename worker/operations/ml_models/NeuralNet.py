@@ -1,32 +1,66 @@
-from worker.operations.ml_models.I_Model import I_Model
+import copy
 
+import numpy as np
 
-class NeuralNet(I_Model):
+from configurations.config import SPLIT_SEED
+from worker.operations.ml_models.CodeArrayModel import CodeArrayModel
+from worker.operations.ml_models.NeuralMF import NeuralMF
 
-    def data_preparation(self, dataframes: dict) -> dict:
-        return {
-            "train_data": None,
-            "validation_data": None,
-            "train_validate_data": None,
-            "test_data": None,
-            "full_data": None,
-        }
 
-    def hyperparameter_selection(self) -> dict:
-        pass
+class NeuralNet(CodeArrayModel):
+    algo = NeuralMF
 
-    def train_test_model(self, params: dict) -> dict:
-        pass
+    def __init__(self) -> None:
+        super().__init__()
+        self.runtime_params: dict = {}
 
-    def fit_and_validate(self, dataframes: dict) -> dict:
-        params = {}
-        metrics = {
-            "Precision@k": None,
-            "Recall@K": None,
-            "RMSE": 100,
+    def _configure(self, configuration_dict: dict) -> None:
+        runtime_parameters = configuration_dict["Model_runtime_parameters"]
+        self.runtime_params = {
+            "n_threads": runtime_parameters.get("N_Threads", 1),
+            "time_budget": runtime_parameters.get("NN_Time_Budget"),
         }
+        super()._configure(configuration_dict)
+
+    def _param_grid(self, configuration_dict: dict) -> dict:
+        hyperparameter_config = configuration_dict["Model_Hyperparameter_Config"]
+        return {
+            "n_factors": hyperparameter_config.get("NN_Factors", [32]),
+            "n_epochs": hyperparameter_config.get("NN_Epochs", [20]),
+            "lr": hyperparameter_config.get("NN_Lr", [0.05, 0.2]),
+            "negative_ratio": hyperparameter_config.get("NN_Negative_Ratio", [0, 1]),
+        }
+
+    def _fit_arrays(
+        self,
+        params: dict,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+    ) -> NeuralMF:
+        rating_matrix = self.data_splits.rating_matrix
+        model = self.algo(**params, **self.runtime_params, random_state=SPLIT_SEED)
+
+        return model.fit(
+            user_codes,
+            item_codes,
+            ratings,
+            user_ids=rating_matrix.user_ids,
+            isbns=rating_matrix.isbns,
+            rating_scale=self.rating_scale,
+        )
 
-        return {"model_name": self, "params": params, "metrics": metrics}
+    def _continue_fit(
+        self, model: NeuralMF, params: dict, split_name: str, n_epochs: int
+    ) -> NeuralMF:
+        rating_matrix = self.data_splits.rating_matrix
+        model = copy.deepcopy(model)
+        model.n_epochs = n_epochs
 
-    def fit_final_model(self, params: dict) -> dict:
-        pass
+        return model.fit(
+            *self.data_splits.arrays(split_name),
+            user_ids=rating_matrix.user_ids,
+            isbns=rating_matrix.isbns,
+            rating_scale=self.rating_scale,
+            warm_start=True,
+        )
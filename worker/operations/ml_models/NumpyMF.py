@@ -0,0 +1,64 @@
+import numpy as np
+
+from configurations.config import SPLIT_SEED
+from worker.operations.ml_models.CodeArrayModel import CodeArrayModel
+from worker.operations.ml_models.FactorModel import FactorModel
+from worker.operations.ml_models.SGDMatrixFactorization import SGDMatrixFactorization
+
+
+class NumpyMFModel(CodeArrayModel):
+    algo = SGDMatrixFactorization
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.batch_size: int = 4096
+        self.reg_all: float = 0.02
+
+    def _configure(self, configuration_dict: dict) -> None:
+        hyperparameter_config = configuration_dict["Model_Hyperparameter_Config"]
+        self.reg_all = hyperparameter_config.get("Reg_All", self.reg_all)
+        self.batch_size = hyperparameter_config.get("Batch_Size", self.batch_size)
+        super()._configure(configuration_dict)
+
+    def _param_grid(self, configuration_dict: dict) -> dict:
+        hyperparameter_config = configuration_dict["Model_Hyperparameter_Config"]
+        return {
+            "n_epochs": hyperparameter_config["N_epochs"],
+            "n_factors": hyperparameter_config["N_factors"],
+            "lr_all": hyperparameter_config["Lr_All"],
+        }
+
+    def _fit_arrays(
+        self,
+        params: dict,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        init: FactorModel | None = None,
+    ) -> FactorModel:
+        rating_matrix = self.data_splits.rating_matrix
+        model = self.algo(
+            **params,
+            reg_all=self.reg_all,
+            batch_size=self.batch_size,
+            random_state=SPLIT_SEED,
+        )
+
+        return model.fit(
+            user_codes,
+            item_codes,
+            ratings,
+            user_ids=rating_matrix.user_ids,
+            isbns=rating_matrix.isbns,
+            rating_scale=self.rating_scale,
+            init=init,
+        )
+
+    def _continue_fit(
+        self, model: FactorModel, params: dict, split_name: str, n_epochs: int
+    ) -> FactorModel:
+        return self._fit_arrays(
+            {**params, "n_epochs": n_epochs},
+            *self.data_splits.arrays(split_name),
+            init=model,
+        )
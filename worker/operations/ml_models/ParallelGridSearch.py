@@ -0,0 +1,170 @@
+import itertools
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy as np
+from loguru import logger
+
+from configurations.config import SPLIT_SEED
+from helpers.shared_arrays import SharedArrays
+from worker.operations.Evaluator import Evaluator
+from worker.operations.ml_models.FactorModel import FactorModel
+from worker.operations.ml_models.SurpriseDataAdapter import SurpriseDataAdapter
+
+# Per-process state of pool workers, set once by _attach_worker().
+_worker_state: dict = {}
+
+
+class ParallelGridSearch:
+    # Cross-validated grid search over a process pool. The ratings and the fold
+    # assignment are built once and shared with the workers through shared
+    # memory, so a task only ships its (params, fold, data_fraction) triple.
+
+    def __init__(
+        self,
+        algo_class,
+        param_grid: dict,
+        rating_scale: tuple[float, float],
+        cv: int = 5,
+        n_jobs: int = 1,
+        seed: int = SPLIT_SEED,
+    ) -> None:
+        self.algo_class = algo_class
+        self.param_grid = param_grid
+        self.rating_scale = rating_scale
+        self.cv = cv
+        self.n_jobs = max(int(n_jobs), 1)
+        self.seed = seed
+
+        self.candidates: list[dict] = [
+            dict(zip(param_grid.keys(), values))
+            for values in itertools.product(*param_grid.values())
+        ]
+        self.cv_results: list[dict] = []
+        self.best_params: dict = None
+        # Compute spent, in epochs x training ratings.
+        self.cost: float = 0.0
+
+    @staticmethod
+    def _attach_worker(descriptor: dict, n_users: int, n_items: int, rating_scale):
+        arrays, blocks = SharedArrays.attach(descriptor)
+        _worker_state.update(
+            arrays=arrays,
+            blocks=blocks,
+            data_adapter=SurpriseDataAdapter(
+                np.arange(n_users), np.arange(n_items), rating_scale
+            ),
+        )
+
+    @staticmethod
+    def _evaluate(
+        algo_class, params: dict, fold: int, data_fraction: float = 1.0
+    ) -> tuple[float, float]:
+        arrays = _worker_state["arrays"]
+        data_adapter: SurpriseDataAdapter = _worker_state["data_adapter"]
+
+        in_fold = arrays["fold_ids"] == fold
+        in_train = ~in_fold
+        if data_fraction < 1.0:
+            in_train &= arrays["sample_keys"] < data_fraction
+        columns = (arrays["user_codes"], arrays["item_codes"], arrays["ratings"])
+
+        trainset = data_adapter.build_trainset(*(c[in_train] for c in columns))
+        user_codes, item_codes, ratings = (c[in_fold] for c in columns)
+
+        model = algo_class(**params)
+        model.fit(trainset)
+
+        est = FactorModel.from_surprise(model).predict(user_codes, item_codes)
+        return Evaluator.rmse(est, ratings), float(model.n_epochs * trainset.n_ratings)
+
+    def _full_cost(self, n_ratings: int) -> float:
+        # Cost of the exhaustive cross-validated grid, for comparisons.
+        n_train = n_ratings * (self.cv - 1) / self.cv
+        return sum(params["n_epochs"] * n_train * self.cv for params in self.candidates)
+
+    def _search(self, run_tasks, n_ratings: int) -> dict:
+        tasks = [
+            (params, fold, 1.0) for params in self.candidates for fold in range(self.cv)
+        ]
+        scores = run_tasks(tasks)
+
+        fold_scores = np.asarray(scores).reshape(len(self.candidates), self.cv)
+        self.cv_results = [
+            {"params": params, "mean_rmse": float(rmse)}
+            for params, rmse in zip(self.candidates, fold_scores.mean(axis=1))
+        ]
+
+        return min(self.cv_results, key=lambda x: x["mean_rmse"])["params"]
+
+    def __execute(self, executor: Executor | None, tasks: list[tuple]) -> list[float]:
+        if executor is None:
+            results = [self._evaluate(self.algo_class, *task) for task in tasks]
+        else:
+            futures = [
+                executor.submit(self._evaluate, self.algo_class, *task)
+                for task in tasks
+            ]
+            results = [future.result() for future in futures]
+
+        self.cost += sum(cost for _, cost in results)
+        return [rmse for rmse, _ in results]
+
+    def fit(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        n_users: int,
+        n_items: int,
+    ) -> dict:
+        start = time.time()
+        rng = np.random.default_rng(self.seed)
+        n_ratings = len(ratings)
+        self.cost = 0.0
+
+        shared = SharedArrays(
+            {
+                "user_codes": user_codes,
+                "item_codes": item_codes,
+                "ratings": ratings,
+                "fold_ids": (rng.permutation(n_ratings) % self.cv).astype(np.int8),
+                "sample_keys": rng.random(n_ratings, dtype=np.float32),
+            }
+        )
+        initargs = (shared.descriptor, n_users, n_items, self.rating_scale)
+
+        try:
+            if self.n_jobs == 1:
+                self._attach_worker(*initargs)
+                self.best_params = self._search(
+                    lambda tasks: self.__execute(None, tasks), n_ratings
+                )
+            else:
+                executor = ProcessPoolExecutor(
+                    max_workers=self.n_jobs,
+                    initializer=self._attach_worker,
+                    initargs=initargs,
+                )
+                try:
+                    self.best_params = self._search(
+                        lambda tasks: self.__execute(executor, tasks), n_ratings
+                    )
+                except BaseException:
+                    # Interrupted (e.g. a cancelled candidate): queued fits are
+                    # dropped instead of waited for.
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+                executor.shutdown()
+        finally:
+            _worker_state.clear()
+            shared.close()
+
+        saved = 1.0 - self.cost / self._full_cost(n_ratings)
+        logger.info(
+            f"{type(self).__name__}: {round(self.cost / 1e6, 2)}M epoch-ratings "
+            f"({round(100 * saved, 1)}% saved vs. the full grid) on {self.n_jobs} "
+            f"workers within {round(time.time() - start, 3)} sec."
+        )
+
+        return self.best_params
@@ -0,0 +1,160 @@
+import time
+
+import numpy as np
+from loguru import logger
+
+from worker.operations.ml_models.FactorModel import FactorModel
+
+
+class SGDMatrixFactorization:
+    # Biased matrix factorization trained with vectorized mini-batch SGD on
+    # float32 arrays of RatingMatrix codes. Each batch gathers its factor rows,
+    # computes all errors at once and scatters the updates back with np.add.at,
+    # i.e. the per-rating update of surprise's SVD without a Python loop.
+
+    def __init__(
+        self,
+        n_factors: int = 100,
+        n_epochs: int = 20,
+        lr_all: float = 0.005,
+        reg_all: float = 0.02,
+        batch_size: int = 4096,
+        init_std_dev: float = 0.1,
+        random_state: int | None = None,
+    ) -> None:
+        self.n_factors = int(n_factors)
+        self.n_epochs = int(n_epochs)
+        self.lr_all = np.float32(lr_all)
+        self.reg_all = np.float32(reg_all)
+        self.batch_size = int(batch_size)
+        self.init_std_dev = init_std_dev
+        self.random_state = random_state
+
+    def __initial_state(
+        self, rng: np.random.Generator, n_users: int, n_items: int
+    ) -> tuple[np.ndarray, ...]:
+        def normal(n_rows):
+            return rng.normal(0, self.init_std_dev, (n_rows, self.n_factors)).astype(
+                np.float32
+            )
+
+        return (
+            np.zeros(n_users, dtype=np.float32),
+            np.zeros(n_items, dtype=np.float32),
+            normal(n_users),
+            normal(n_items),
+        )
+
+    @staticmethod
+    def __batch_counts(codes: np.ndarray) -> np.ndarray:
+        # How often each entry's code occurs in the batch. Sorting the batch
+        # costs O(batch log batch); np.bincount would allocate O(n codes).
+        _, inverse, counts = np.unique(codes, return_inverse=True, return_counts=True)
+        return counts[inverse].astype(np.float32)
+
+    def __run_epoch(
+        self,
+        rng: np.random.Generator,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        global_mean: np.float32,
+        user_bias: np.ndarray,
+        item_bias: np.ndarray,
+        user_factors: np.ndarray,
+        item_factors: np.ndarray,
+    ) -> float:
+        lr, reg = self.lr_all, self.reg_all
+        order = rng.permutation(len(ratings))
+        squared_error = 0.0
+
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start : start + self.batch_size]
+            users, items, r = user_codes[batch], item_codes[batch], ratings[batch]
+
+            bu, bi = user_bias[users], item_bias[items]
+            pu, qi = user_factors[users], item_factors[items]
+            err = r - (global_mean + bu + bi + np.einsum("ij,ij->i", pu, qi))
+            squared_error += float(np.dot(err, err))
+
+            # Rows repeated inside a batch get the mean of their updates, so a
+            # popular item cannot take hundreds of full steps at once.
+            user_lr = lr / self.__batch_counts(users)
+            item_lr = lr / self.__batch_counts(items)
+
+            np.add.at(user_bias, users, user_lr * (err - reg * bu))
+            np.add.at(item_bias, items, item_lr * (err - reg * bi))
+            np.add.at(
+                user_factors, users, user_lr[:, None] * (err[:, None] * qi - reg * pu)
+            )
+            np.add.at(
+                item_factors, items, item_lr[:, None] * (err[:, None] * pu - reg * qi)
+            )
+
+        return float(np.sqrt(squared_error / max(len(order), 1)))
+
+    def fit(
+        self,
+        user_codes: np.ndarray,
+        item_codes: np.ndarray,
+        ratings: np.ndarray,
+        user_ids: np.ndarray,
+        isbns: np.ndarray,
+        rating_scale: tuple[float, float],
+        init: FactorModel | None = None,
+    ) -> FactorModel:
+        # With ``init`` the factors and biases start from an existing model
+        # (same code space) instead of random values, i.e. a warm start.
+        start = time.time()
+        rng = np.random.default_rng(self.random_state)
+        n_users, n_items = len(user_ids), len(isbns)
+        ratings = np.asarray(ratings, dtype=np.float32)
+        global_mean = np.float32(ratings.mean()) if len(ratings) else np.float32(0)
+
+        if init is None:
+            user_bias, item_bias, user_factors, item_factors = self.__initial_state(
+                rng, n_users, n_items
+            )
+        else:
+            user_bias = init.user_bias.copy()
+            item_bias = init.item_bias.copy()
+            user_factors = init.user_factors.copy()
+            item_factors = init.item_factors.copy()
+
+        train_rmse = None
+        for _ in range(self.n_epochs):
+            train_rmse = self.__run_epoch(
+                rng,
+                user_codes,
+                item_codes,
+                ratings,
+                global_mean,
+                user_bias,
+                item_bias,
+                user_factors,
+                item_factors,
+            )
+
+        known_users = np.bincount(user_codes, minlength=n_users) > 0
+        known_items = np.bincount(item_codes, minlength=n_items) > 0
+        if init is not None:
+            known_users |= init.known_users
+            known_items |= init.known_items
+
+        logger.debug(
+            f"SGD MF: {self.n_epochs} epochs over {len(ratings)} ratings, "
+            f"train RMSE {train_rmse}, within {round(time.time() - start, 3)} sec."
+        )
+
+        return FactorModel(
+            global_mean=global_mean,
+            user_bias=user_bias,
+            item_bias=item_bias,
+            user_factors=user_factors,
+            item_factors=item_factors,
+            user_ids=user_ids,
+            isbns=isbns,
+            rating_scale=rating_scale,
+            known_users=known_users,
+            known_items=known_items,
+        )
@@ -1,166 +1,248 @@
-from collections import defaultdict
-
+import numpy as np
 from loguru import logger
-from pandas import DataFrame as pd_DataFrame
-from surprise import SVD, Dataset, Reader, accuracy
-from surprise.model_selection import GridSearchCV
+from scipy.stats import spearmanr
+from surprise import SVD, Reader, Trainset
 from surprise.prediction_algorithms.algo_base import AlgoBase
 
-from configurations.config import RATING_SCALE_MAX, RATING_SCALE_MIN
+from configurations.config import RATING_SCALE_MAX, RATING_SCALE_MIN, SPLIT_SEED
+from helpers.group_sampling import sample_per_group
+from worker.operations.DataSplits import DataSplits
+from worker.operations.Evaluator import Evaluator
+from worker.operations.ml_models.FactorModel import FactorModel
 from worker.operations.ml_models.I_Model import I_Model
+from worker.operations.ml_models.ParallelGridSearch import ParallelGridSearch
+from worker.operations.ml_models.SGDMatrixFactorization import SGDMatrixFactorization
+from worker.operations.ml_models.SuccessiveHalvingSearch import (
+    SuccessiveHalvingSearch,
+)
+from worker.operations.ml_models.SurpriseDataAdapter import SurpriseDataAdapter
+from worker.operations.ml_models.TrainingOrchestrator import TrainingOrchestrator
 
 
 class SurpriseSVDModel(I_Model):
     algo = SVD
+    holdout_size = 0.2
 
     def __init__(self) -> None:
-        self.train_validate_data: Dataset = None
-        self.full_data: Dataset = None
-        self.train_data: Dataset = None
-        self.validation_data: Dataset = None
-        self.test_data: Dataset = None
-        self.val_raw_ratings = None
-        self.test_raw_ratings = None
-
-    def data_preparation(self, dataframes: dict) -> None:
+        self.data_adapter: SurpriseDataAdapter = None
+        self.data_splits: DataSplits = None
+        self.trainsets: dict[str, Trainset] = {}
+        self.orchestrator = TrainingOrchestrator(self.__fit, self.__continue_fit)
+
+    def data_preparation(self, data_splits: DataSplits) -> None:
         reader = Reader(rating_scale=(RATING_SCALE_MIN, RATING_SCALE_MAX))
 
-        train_data: pd_DataFrame = dataframes.get("train_data")
-        validation_data: pd_DataFrame = dataframes.get("validation_data")
-        test_data: pd_DataFrame = dataframes.get("test_data")
-        train_validate_data: pd_DataFrame = dataframes.get("train_validate_data")
-        full_data: pd_DataFrame = dataframes.get("full_data")
+        self.data_splits = data_splits
+        self.data_adapter = SurpriseDataAdapter(
+            user_ids=data_splits.rating_matrix.user_ids,
+            isbns=data_splits.rating_matrix.isbns,
+            rating_scale=reader.rating_scale,
+        )
+        self.trainsets = {}
+        self.orchestrator.reset()
+
+        logger.debug("Done")
 
-        self.train_data = Dataset.load_from_df(
-            train_data[["user_id", "isbn", "rating"]], reader
+    def __get_trainset(self, split_name: str) -> Trainset:
+        # Built on first use and kept for the rest of the cycle.
+        if split_name not in self.trainsets:
+            self.trainsets[split_name] = self.data_adapter.build_trainset(
+                *self.data_splits.arrays(split_name)
+            )
+        return self.trainsets[split_name]
+
+    def __fit(self, params: dict, split_name: str) -> AlgoBase:
+        model: AlgoBase = self.algo(**params)
+        return model.fit(self.__get_trainset(split_name))
+
+    def __continue_fit(
+        self, model: AlgoBase, params: dict, split_name: str, n_epochs: int
+    ) -> FactorModel:
+        # Surprise cannot resume training, so the factors are continued with
+        # the NumPy SGD on the same code space.
+        rating_matrix = self.data_splits.rating_matrix
+        sgd = SGDMatrixFactorization(
+            n_factors=model.n_factors,
+            n_epochs=n_epochs,
+            lr_all=model.lr_bu,
+            reg_all=model.reg_bu,
+            random_state=SPLIT_SEED,
         )
-        self.validation_data = Dataset.load_from_df(
-            validation_data[["user_id", "isbn", "rating"]], reader
+
+        return sgd.fit(
+            *self.data_splits.arrays(split_name),
+            user_ids=rating_matrix.user_ids,
+            isbns=rating_matrix.isbns,
+            rating_scale=self.data_adapter.rating_scale,
+            init=FactorModel.from_surprise(model),
         )
-        self.test_data = Dataset.load_from_df(
-            test_data[["user_id", "isbn", "rating"]], reader
+
+    def __get_search(self, configuration_dict: dict) -> ParallelGridSearch:
+        hyperparameter_config = configuration_dict["Model_Hyperparameter_Config"]
+        search_strategy = hyperparameter_config.get("Search_Strategy", "grid")
+        search_kwargs = {
+            "algo_class": self.algo,
+            "param_grid": {
+                "n_epochs": hyperparameter_config["N_epochs"],
+                "n_factors": hyperparameter_config["N_factors"],
+                "lr_all": hyperparameter_config["Lr_All"],
+            },
+            "rating_scale": self.data_adapter.rating_scale,
+            "cv": 5,
+            "n_jobs": configuration_dict["Model_runtime_parameters"].get("N_Jobs", 1),
+        }
+
+        if search_strategy == "grid":
+            return ParallelGridSearch(**search_kwargs)
+
+        if search_strategy not in ("successive_halving", "hyperband"):
+            raise ValueError(f"Unknown Search_Strategy '{search_strategy}'.")
+
+        return SuccessiveHalvingSearch(
+            **search_kwargs,
+            eta=hyperparameter_config.get("Halving_Eta", 3),
+            min_resource=hyperparameter_config.get("Min_Resource"),
+            hyperband=search_strategy == "hyperband",
         )
-        self.train_validate_data = Dataset.load_from_df(
-            train_validate_data[["user_id", "isbn", "rating"]], reader
+
+    def __subsample(self, fraction: float) -> tuple[np.ndarray, ...]:
+        # Same share of every user's ratings, so per-user proportions hold; a
+        # user with fewer than 1 / fraction ratings still keeps one.
+        user_codes, item_codes, ratings = self.data_splits.arrays("train_data")
+        in_sample = sample_per_group(
+            group_codes=user_codes,
+            eligible=np.ones(len(user_codes), dtype=bool),
+            fraction=fraction,
+            seed=SPLIT_SEED,
+            min_per_group=1,
         )
-        self.full_data = Dataset.load_from_df(
-            full_data[["user_id", "isbn", "rating"]], reader
+
+        return user_codes[in_sample], item_codes[in_sample], ratings[in_sample]
+
+    @staticmethod
+    def __log_ranking_agreement(
+        sample_results: list[dict], full_results: list[dict]
+    ) -> None:
+        full_rmse = {
+            str(sorted(result["params"].items())): result["mean_rmse"]
+            for result in full_results
+        }
+        pairs = [
+            (result["mean_rmse"], full_rmse[key])
+            for result in sample_results
+            if (key := str(sorted(result["params"].items()))) in full_rmse
+        ]
+        if len(pairs) < 2:
+            logger.info("Too few common candidates to compare the search rankings.")
+            return
+
+        sample_rmse, matched_full_rmse = np.asarray(pairs).T
+        correlation = spearmanr(sample_rmse, matched_full_rmse).statistic
+        same_best = np.argmin(sample_rmse) == np.argmin(matched_full_rmse)
+        logger.info(
+            f"Subsample vs. full search over {len(pairs)} candidates: Spearman "
+            f"{round(float(correlation), 3)}, same best params: {bool(same_best)}."
         )
 
-        self.val_raw_ratings = self.validation_data.raw_ratings
-        self.test_raw_ratings = self.test_data.raw_ratings
+    def __score_finalists(self, finalists: list[dict]) -> list[dict]:
+        # One fit per finalist on the full train split, scored on a seeded
+        # holdout: a cheap stand-in for searching the full split again.
+        user_codes, item_codes, ratings = self.data_splits.arrays("train_data")
+        rng = np.random.default_rng(SPLIT_SEED)
+        in_holdout = rng.random(len(ratings)) < self.holdout_size
+        trainset = self.data_adapter.build_trainset(
+            user_codes[~in_holdout], item_codes[~in_holdout], ratings[~in_holdout]
+        )
 
-        logger.debug("Done")
+        results = []
+        for result in finalists:
+            model: AlgoBase = self.algo(**result["params"])
+            model.fit(trainset)
+            est = self.predict_batch(
+                model, user_codes[in_holdout], item_codes[in_holdout]
+            )
+            results.append(
+                {
+                    "params": result["params"],
+                    "mean_rmse": Evaluator.rmse(est, ratings[in_holdout]),
+                }
+            )
+
+        return results
 
     def hyperparameter_selection(self, configuration_dict: dict) -> dict:
-        lr_all = configuration_dict["Model_Hyperparameter_Config"]["Lr_All"]
-        n_epochs = configuration_dict["Model_Hyperparameter_Config"]["N_epochs"]
-        n_factors = configuration_dict["Model_Hyperparameter_Config"]["N_factors"]
-
-        grid_search = GridSearchCV(
-            algo_class=self.algo,
-            param_grid={
-                "n_epochs": n_epochs,
-                "n_factors": n_factors,
-                "lr_all": lr_all,
-            },
-            measures=["rmse"],
-            cv=5,
+        # With Search_Subsample < 1 the grid is ranked on a user-stratified
+        # share of train_data only; the later fits still use the full splits.
+        hyperparameter_config = configuration_dict["Model_Hyperparameter_Config"]
+        fraction = float(hyperparameter_config.get("Search_Subsample", 1.0))
+        search_data = self.data_splits.arrays("train_data")
+        if fraction < 1.0:
+            search_data = self.__subsample(fraction)
+
+        search = self.__get_search(configuration_dict)
+        params_dict: dict = search.fit(
+            *search_data,
+            n_users=self.data_adapter.n_users,
+            n_items=self.data_adapter.n_items,
         )
 
-        grid_search.fit(data=self.train_data)
-        params_dict: dict = grid_search.best_params["rmse"]
+        # Checks the subsample can be trusted. By default only the best few
+        # candidates are refit on the full train split; Search_Subsample_Check
+        # ranks the whole grid on it, as expensive as not subsampling.
+        n_finalists = int(hyperparameter_config.get("Search_Subsample_Finalists", 3))
+        if fraction < 1.0 and hyperparameter_config.get("Search_Subsample_Check"):
+            full_search = self.__get_search(configuration_dict)
+            full_search.fit(
+                *self.data_splits.arrays("train_data"),
+                n_users=self.data_adapter.n_users,
+                n_items=self.data_adapter.n_items,
+            )
+            self.__log_ranking_agreement(search.cv_results, full_search.cv_results)
+        elif fraction < 1.0 and n_finalists > 1:
+            finalists = sorted(search.cv_results, key=lambda x: x["mean_rmse"])
+            finalists = finalists[:n_finalists]
+            self.__log_ranking_agreement(finalists, self.__score_finalists(finalists))
 
         logger.debug("Done")
 
         return params_dict
 
-    # the code is taken from the surprise documentation
     @staticmethod
-    def __precision_recall_at_k(
-        predictions, k=10, threshold=0.7
-    ) -> tuple[float, float]:
-        user_est_true = defaultdict(list)
-        for uid, _, true_r, est, _ in predictions:
-            user_est_true[uid].append((est, true_r))
-
-        precisions = dict()
-        recalls = dict()
-        for uid, user_ratings in user_est_true.items():
-
-            # Sort user ratings by estimated value
-            user_ratings.sort(key=lambda x: x[0], reverse=True)
-
-            # Number of relevant items
-            n_rel = sum((true_r >= threshold) for (_, true_r) in user_ratings)
-
-            # Number of recommended items in top k
-            n_rec_k = sum((est >= threshold) for (est, _) in user_ratings[:k])
-
-            # Number of relevant and recommended items in top k
-            n_rel_and_rec_k = sum(
-                ((true_r >= threshold) and (est >= threshold))
-                for (est, true_r) in user_ratings[:k]
-            )
+    def predict_batch(
+        model: AlgoBase | FactorModel, user_codes: np.ndarray, item_codes: np.ndarray
+    ) -> np.ndarray:
+        # Vectorized equivalent of model.test() over RatingMatrix codes.
+        if isinstance(model, AlgoBase):
+            model = FactorModel.from_surprise(model)
+        return model.predict(user_codes, item_codes)
 
-            # Precision@K: Proportion of recommended items that are relevant
-            # When n_rec_k is 0, Precision is undefined. We here set it to 0.
+    def __evaluate(self, model: AlgoBase | FactorModel, split_name: str) -> dict:
+        user_codes, item_codes, ratings = self.data_splits.arrays(split_name)
+        est = self.predict_batch(model, user_codes, item_codes)
 
-            precisions[uid] = n_rel_and_rec_k / n_rec_k if n_rec_k != 0 else 0
-
-            # Recall@K: Proportion of relevant items that are recommended
-            # When n_rel is 0, Recall is undefined. We here set it to 0.
-
-            recalls[uid] = n_rel_and_rec_k / n_rel if n_rel != 0 else 0
-
-            mean_precision = sum(precisions.values()) / len(precisions)
-            mean_recall = sum(recalls.values()) / len(recalls)
-
-        return mean_precision, mean_recall
+        return Evaluator.get_metrics(user_codes, est, ratings)
 
     def train_test_model(self, params: dict) -> dict:
-        model: AlgoBase = self.algo(**params)
-        model.fit(self.train_data.build_full_trainset())
-        valset = self.validation_data.construct_testset(
-            raw_testset=self.val_raw_ratings
-        )
-        predictions = model.test(valset)
-
-        unbiased_rmse = accuracy.rmse(predictions=predictions, verbose=False)
-        precisions, recalls = self.__precision_recall_at_k(predictions=predictions)
-
-        metrics = {
-            "Precision@k": precisions,
-            "Recall@K": recalls,
-            "RMSE": unbiased_rmse,
-        }
+        model = self.orchestrator.fit(params, "train_data")
+        metrics = self.__evaluate(model, "validation_data")
 
         logger.debug("Done")
 
         return metrics
 
     def __get_final_metrics(self, params: dict) -> dict:
-
-        model: AlgoBase = self.algo(**params)
-        model.fit(self.train_validate_data.build_full_trainset())
-        test_set = self.test_data.construct_testset(self.test_raw_ratings)
-        predictions = model.test(test_set)
-
-        unbiased_rmse = accuracy.rmse(predictions=predictions, verbose=False)
-        precisions, recalls = self.__precision_recall_at_k(predictions=predictions)
-
-        metrics = {
-            "Precision@k": precisions,
-            "Recall@K": recalls,
-            "RMSE": unbiased_rmse,
-        }
+        model = self.orchestrator.fit(params, "train_validate_data")
+        metrics = self.__evaluate(model, "test_data")
 
         logger.debug("Done")
 
         return metrics
 
-    def fit_and_validate(self, dataframes: dict, configuration_dict: dict) -> dict:
-        self.data_preparation(dataframes)
+    def fit_and_validate(
+        self, data_splits: DataSplits, configuration_dict: dict
+    ) -> dict:
+        self.data_preparation(data_splits)
+        self.orchestrator.configure(configuration_dict)
         params = self.hyperparameter_selection(configuration_dict)
         metrics = self.train_test_model(params)
 
@@ -168,10 +250,16 @@ class SurpriseSVDModel(I_Model):
 
         return {"model_name": self, "params": params, "metrics": metrics}
 
+    def prepare_final_fit(
+        self, data_splits: DataSplits, configuration_dict: dict
+    ) -> None:
+        self.data_preparation(data_splits)
+        self.orchestrator.configure(configuration_dict)
+
     def fit_final_model(self, params: dict) -> dict:
         final_metrics = self.__get_final_metrics(params)
-        model: AlgoBase = self.algo(**params)
-        trained_model = model.fit(self.full_data.build_full_trainset())
+        trained_model = self.orchestrator.final_model(params)
+        self.trainsets = {}
 
         logger.debug("Done")
         logger.info(f"Final model has {round(final_metrics.get('RMSE'), 2)} RMSE")
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+from loguru import logger
+
+from worker.operations.ml_models.ParallelGridSearch import ParallelGridSearch
+
+
+class SuccessiveHalvingSearch(ParallelGridSearch):
+    # Successive halving over the same grid: every candidate is first trained
+    # with a small resource, and only the best 1/eta move on to eta times more.
+    # The resource r scales both the epochs and the training-data fraction by
+    # sqrt(r), so one fit costs ~r of a full one. Rungs are scored on a single
+    # holdout fold. With hyperband=True several brackets with different
+    # starting resources are run and the best final-rung candidate wins.
+
+    def __init__(
+        self,
+        *args,
+        eta: int = 3,
+        min_resource: float | None = None,
+        hyperband: bool = False,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.eta = max(int(eta), 2)
+        self.hyperband = hyperband
+
+        if min_resource is None:
+            n_rungs = int(math.log(len(self.candidates), self.eta) + 1e-9) + 1
+            min_resource = self.eta ** -(n_rungs - 1)
+        self.min_resource = min(max(float(min_resource), 1e-6), 1.0)
+
+    @staticmethod
+    def __scale(params: dict, budget: float) -> dict:
+        return dict(params, n_epochs=max(1, round(params["n_epochs"] * budget)))
+
+    def __successive_halving(
+        self, run_tasks, candidates: list[dict], min_resource: float
+    ) -> list[tuple[dict, float]]:
+        resource = min_resource
+        rung = 0
+
+        while True:
+            budget = math.sqrt(resource)
+            tasks = [(self.__scale(params, budget), 0, budget) for params in candidates]
+            scores = run_tasks(tasks)
+            ranked = sorted(zip(candidates, scores), key=lambda x: x[1])
+
+            logger.debug(
+                f"Successive halving rung {rung}: {len(candidates)} candidates "
+                f"at resource {round(resource, 3)}, best RMSE {round(ranked[0][1], 4)}."
+            )
+            if resource >= 1.0:
+                return ranked
+
+            candidates = [
+                params for params, _ in ranked[: max(1, len(ranked) // self.eta)]
+            ]
+            resource = min(1.0, resource * self.eta)
+            rung += 1
+
+    def __brackets(self) -> list[tuple[list[dict], float]]:
+        if not self.hyperband:
+            return [(self.candidates, self.min_resource)]
+
+        rng = np.random.default_rng(self.seed)
+        s_max = int(math.log(1.0 / self.min_resource, self.eta) + 1e-9)
+        brackets = []
+        for s in range(s_max, -1, -1):
+            n_candidates = math.ceil((s_max + 1) / (s + 1) * self.eta**s)
+            n_candidates = min(n_candidates, len(self.candidates))
+            picked = rng.choice(len(self.candidates), size=n_candidates, replace=False)
+            brackets.append(
+                ([self.candidates[i] for i in sorted(picked)], self.eta**-s)
+            )
+
+        return brackets
+
+    def _search(self, run_tasks, n_ratings: int) -> dict:
+        finalists = []
+        for candidates, min_resource in self.__brackets():
+            finalists.extend(
+                self.__successive_halving(run_tasks, candidates, min_resource)
+            )
+
+        self.cv_results = [
+            {"params": params, "mean_rmse": float(rmse)} for params, rmse in finalists
+        ]
+
+        return min(self.cv_results, key=lambda x: x["mean_rmse"])["params"]
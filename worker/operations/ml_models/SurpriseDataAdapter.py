@@ -0,0 +1,57 @@
+import numpy as np
+from surprise import Trainset
+
+
+class SurpriseDataAdapter:
+    # Builds surprise trainsets straight from encoded ratings. Inner ids
+    # are the global codes and raw ids are the given user ids and ISBNs (the
+    # RatingMatrix mappings), so every split shares the same two lookup dicts
+    # and saved models stay readable without the RatingMatrix.
+
+    def __init__(
+        self,
+        user_ids: np.ndarray,
+        isbns: np.ndarray,
+        rating_scale: tuple[float, float],
+    ) -> None:
+        self.rating_scale = rating_scale
+        self.n_users = len(user_ids)
+        self.n_items = len(isbns)
+        self.__raw2inner_id_users = {
+            raw_id: code for code, raw_id in enumerate(np.asarray(user_ids).tolist())
+        }
+        self.__raw2inner_id_items = {
+            raw_id: code for code, raw_id in enumerate(np.asarray(isbns).tolist())
+        }
+
+    @staticmethod
+    def __group_by(
+        keys: np.ndarray, values: np.ndarray, ratings: np.ndarray
+    ) -> dict[int, list]:
+        order = np.argsort(keys, kind="stable")
+        keys, values, ratings = keys[order], values[order], ratings[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else []
+        bounds = np.r_[starts, len(keys)]
+
+        pairs = list(zip(values.tolist(), ratings.tolist()))
+        return {
+            int(keys[start]): pairs[start:end]
+            for start, end in zip(bounds[:-1], bounds[1:])
+        }
+
+    def build_trainset(
+        self, user_codes: np.ndarray, item_codes: np.ndarray, ratings: np.ndarray
+    ) -> Trainset:
+        ur = self.__group_by(user_codes, item_codes, ratings)
+        ir = self.__group_by(item_codes, user_codes, ratings)
+
+        return Trainset(
+            ur=ur,
+            ir=ir,
+            n_users=self.n_users,
+            n_items=self.n_items,
+            n_ratings=len(ratings),
+            rating_scale=self.rating_scale,
+            raw2inner_id_users=self.__raw2inner_id_users,
+            raw2inner_id_items=self.__raw2inner_id_items,
+        )
@@ -0,0 +1,64 @@
+from typing import Any, Callable
+
+from loguru import logger
+
+
+class TrainingOrchestrator:
+    # Fits a model's params on a named split at most once per cycle and derives
+    # the final full-data model according to a policy:
+    #   refit    - fit from scratch on full_data (train, train_validate, full)
+    #   continue - continue the train_validate model for a few epochs on
+    #              full_data instead of a third fit from scratch
+    #   reuse    - ship the train_validate model as is (two fits per cycle)
+    policies = ("refit", "continue", "reuse")
+
+    def __init__(
+        self,
+        fit: Callable[[dict, str], Any],
+        continue_fit: Callable[[Any, dict, str, int], Any],
+    ) -> None:
+        self.__fit = fit
+        self.__continue_fit = continue_fit
+        self.policy = "refit"
+        self.continue_epochs = 3
+        self.n_fits = 0
+        self.__fitted: dict[tuple, Any] = {}
+
+    def configure(self, configuration_dict: dict) -> None:
+        runtime_parameters = configuration_dict["Model_runtime_parameters"]
+        policy = runtime_parameters.get("Final_Fit_Policy", "refit")
+        if policy not in self.policies:
+            raise ValueError(f"Unknown Final_Fit_Policy '{policy}'.")
+
+        self.policy = policy
+        self.continue_epochs = int(runtime_parameters.get("Final_Fit_Epochs", 3))
+
+    def reset(self) -> None:
+        self.n_fits = 0
+        self.__fitted.clear()
+
+    def fit(self, params: dict, split_name: str):
+        key = (split_name, tuple(sorted(params.items())))
+        if key not in self.__fitted:
+            self.__fitted[key] = self.__fit(params, split_name)
+            self.n_fits += 1
+
+        return self.__fitted[key]
+
+    def final_model(self, params: dict):
+        if self.policy == "refit":
+            model = self.fit(params, "full_data")
+        else:
+            model = self.fit(params, "train_validate_data")
+            if self.policy == "continue":
+                model = self.__continue_fit(
+                    model, params, "full_data", self.continue_epochs
+                )
+
+        logger.info(
+            f"Final model derived with the '{self.policy}' policy after "
+            f"{self.n_fits} fits this cycle."
+        )
+        self.reset()
+
+        return model